@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+PixeLab - Vector object memory benchmark
+Measures bytes per object for each vector type and the cost of a large document
+
+Usage: python bench_memory.py [object count] [--baseline CHECKOUT]
+
+--baseline runs the same measurement on another checkout of PixeLab (for example
+`git worktree add ../pixelab-before <commit>`) and prints both side by side.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tracemalloc
+
+if os.environ.get('PIXELAB_SRC'):
+    # Measuring another checkout for --baseline
+    sys.path.insert(0, os.environ['PIXELAB_SRC'])
+
+from src.vector_objects import create_object_from_dict
+from src.object_manager import ObjectManager
+
+
+KINDS = ('pixel', 'line', 'rectangle', 'circle', 'path')
+PALETTE = [[255, 0, 0, 255], [0, 255, 0, 255], [0, 0, 255, 255], [20, 20, 20, 255], [250, 200, 0, 128]]
+
+
+def sample_dict(kind, i):
+    """Object data as it comes out of a .plb file (fresh lists, like json.load)"""
+    x, y = i % 1000, i // 1000
+    color = list(random.choice(PALETTE))
+    if kind == 'pixel':
+        return {'type': 'pixel', 'x': x, 'y': y, 'color': color}
+    if kind == 'line':
+        return {'type': 'line', 'x0': x, 'y0': y, 'x1': x + 5, 'y1': y + 3, 'color': color, 'thickness': 1}
+    if kind == 'rectangle':
+        return {'type': 'rectangle', 'x0': x, 'y0': y, 'x1': x + 4, 'y1': y + 4, 'color': color, 'filled': True}
+    if kind == 'circle':
+        return {'type': 'circle', 'cx': x, 'cy': y, 'radius': 3, 'color': color, 'filled': False}
+    if kind == 'path':
+        return {'type': 'path', 'coords': [x, y, x + 1, y + 2, x + 3, y + 3, x + 4, y + 6],
+                'color': color, 'thickness': 2, 'closed': False}
+    raise ValueError(kind)
+
+
+def measure(build):
+    """Bytes still allocated after build() returns (the result is kept alive while measuring)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def per_object(kind, count):
+    def build():
+        objs = [create_object_from_dict(sample_dict(kind, i)) for i in range(count)]
+        for obj in objs:
+            obj.get_bounds()
+        return objs
+    size, _objs = measure(build)
+    return size / count
+
+
+def document(count):
+    """Mixed document in one layer, including the manager's lookup structures"""
+    kinds = ['pixel', 'pixel', 'pixel', 'line', 'rectangle', 'circle', 'path']
+
+    def build():
+        manager = ObjectManager()
+        layer = manager.current_layer
+        for i in range(count):
+            obj = create_object_from_dict(sample_dict(kinds[i % len(kinds)], i))
+            layer.add(obj)
+        manager.layers = manager.layers  # Rebuild the ID registry
+        layer.spatial_index()
+        return manager
+    size, _manager = measure(build)
+    return size
+
+
+def measure_all(count):
+    """Bytes per object for each kind, and the size of the mixed document"""
+    random.seed(1)
+    results = {kind: per_object(kind, count) for kind in KINDS}
+    results['document'] = document(count)
+    return results
+
+
+def measure_baseline(checkout, count):
+    """measure_all() in a subprocess that imports PixeLab from another checkout"""
+    env = dict(os.environ, PIXELAB_SRC=os.path.abspath(checkout))
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), str(count), '--json'],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PixeLab vector object memory benchmark")
+    parser.add_argument('count', nargs='?', type=int, default=100000)
+    parser.add_argument('--baseline', metavar='CHECKOUT', help="also measure another PixeLab checkout")
+    parser.add_argument('--json', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    count = args.count
+    
+    results = measure_all(count)
+    if args.json:
+        print(json.dumps(results))
+        return
+    
+    if not args.baseline:
+        print(f"Bytes per object ({count} objects each, after a get_bounds() call):")
+        for kind in KINDS:
+            print(f"  {kind:<10} {results[kind]:8.1f}")
+        size = results['document']
+        print(f"Mixed document with {count} objects: {size / 2**20:.1f} MiB ({size / count:.1f} bytes/object)")
+        return
+    
+    before = measure_baseline(args.baseline, count)
+    print(f"Bytes per object ({count} objects each, after a get_bounds() call):")
+    print(f"  {'':<10} {'baseline':>9} {'current':>9} {'change':>8}")
+    for kind in KINDS:
+        print(f"  {kind:<10} {before[kind]:9.1f} {results[kind]:9.1f} {results[kind] / before[kind] - 1:+8.0%}")
+    b, a = before['document'], results['document']
+    print(f"Mixed document with {count} objects: {b / 2**20:.1f} MiB -> {a / 2**20:.1f} MiB ({a / b - 1:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
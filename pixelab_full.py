@@ -50,6 +50,7 @@ class PixelLabFullApp:
         
         # State
         self.current_color = (0, 0, 0, 255)
+        self.current_tile = 1  # Tile index painted by the Tile tool
         self.current_tool = None
         self.file_handler = VectorFileHandler()
         self.palette = ColorPalette()
@@ -200,6 +201,12 @@ class PixelLabFullApp:
         menubar.add_cascade(label=t('edit'), menu=edit_menu)
         edit_menu.add_command(label=t('group'), command=self.group_objects, accelerator="Ctrl+G")
         edit_menu.add_command(label=t('ungroup'), command=self.ungroup_objects, accelerator="Ctrl+U")
+        edit_menu.add_command(label=t('create_symbol'), command=self.create_symbol)
+        edit_menu.add_command(label=t('duplicate'), command=self.duplicate_objects, accelerator="Ctrl+D")
+        edit_menu.add_separator()
+        edit_menu.add_command(label=t('indexed_color_mode'), command=self.toggle_indexed_mode)
+        edit_menu.add_command(label=t('new_tilemap_layer'), command=self.new_tilemap_layer)
+        edit_menu.add_command(label=t('choose_tile'), command=self.choose_tile)
         edit_menu.add_separator()
         edit_menu.add_command(label=t('clear_canvas'), command=self.clear_canvas)
         
@@ -243,7 +250,9 @@ class PixelLabFullApp:
         self.root.bind("<Control-i>", lambda e: self.import_image())
         self.root.bind("<Control-g>", lambda e: self.group_objects())
         self.root.bind("<Control-u>", lambda e: self.ungroup_objects())
+        self.root.bind("<Control-d>", lambda e: self.duplicate_objects())
         self.root.bind("<Delete>", lambda e: self.delete_selected())
+        self.root.bind("<Control-a>", lambda e: self.select_all())
         
         self.root.bind("<Control-bracketright>", lambda e: self.reorder_up())
         self.root.bind("<Control-bracketleft>", lambda e: self.reorder_down())
@@ -261,6 +270,7 @@ class PixelLabFullApp:
         self.root.bind("c", lambda e: self.select_tool("Circle"))
         self.root.bind("f", lambda e: self.select_tool("Fill"))
         self.root.bind("i", lambda e: self.select_tool("Eyedropper"))
+        self.root.bind("t", lambda e: self.select_tool("Tile"))
         
         self.root.bind("g", lambda e: self.toggle_grid())
         self.root.bind("<plus>", lambda e: self._zoom_in())
@@ -286,6 +296,8 @@ class PixelLabFullApp:
                 self.canvas_widget.current_tool.filled = self.toolbar.filled_var.get()
             if name == "Eyedropper":
                 self.canvas_widget.current_tool.color_callback = self._on_eyedropper_pick
+            if hasattr(self.canvas_widget.current_tool, 'tile_index'):
+                self.canvas_widget.current_tool.tile_index = self.current_tile
                 
         self.canvas_widget.force_render()
         self._update_title() # Might be modified
@@ -326,47 +338,6 @@ class PixelLabFullApp:
         self.modified = True
         self._update_title()
     
-    def _on_mouse_press(self, event):
-        """Mouse press"""
-        px, py = self.canvas_widget.screen_to_canvas(event.x, event.y)
-        if 0 <= px < self.canvas_widget.width and 0 <= py < self.canvas_widget.height:
-            # Eyedropper special handling
-            if isinstance(self.current_tool, VectorEyedropperTool):
-                color = self.canvas_widget.get_pixel(px, py)
-                if color:
-                    self.current_tool.pick_color(color)
-                return
-            
-            self.current_tool.on_press(px, py, self.canvas_widget.object_manager)
-            
-            if hasattr(self.current_tool, 'get_preview_object'):
-                self.canvas_widget.set_preview_object(self.current_tool.get_preview_object())
-            
-            self.canvas_widget.render()
-    
-    def _on_mouse_drag(self, event):
-        """Mouse drag"""
-        px, py = self.canvas_widget.screen_to_canvas(event.x, event.y)
-        self.current_tool.on_drag(px, py, self.canvas_widget.object_manager)
-        
-        if hasattr(self.current_tool, 'get_preview_object'):
-            self.canvas_widget.set_preview_object(self.current_tool.get_preview_object())
-        
-        self.canvas_widget.render()
-        self.pos_label.config(text=f"{t('position')}: ({px}, {py})")
-    
-    def _on_mouse_release(self, event):
-        """Mouse release"""
-        px, py = self.canvas_widget.screen_to_canvas(event.x, event.y)
-        self.current_tool.on_release(px, py, self.canvas_widget.object_manager)
-        
-        self.canvas_widget.clear_preview()
-        self.canvas_widget.render()
-        
-        obj_count = len(self.canvas_widget.object_manager.objects)
-        sel_count = len(self.canvas_widget.object_manager.selected_objects)
-        self._update_status(f"{obj_count} {t('objects')}, {sel_count} {t('selected')}")
-    
     def _on_mouse_move(self, event):
         """Mouse move"""
         px, py = self.canvas_widget.screen_to_canvas(event.x, event.y)
@@ -412,7 +383,7 @@ class PixelLabFullApp:
         
         # Show Layer Info if exactly one object is selected (or the one under cursor)
         if sel_count == 1:
-            obj = self.canvas_widget.object_manager.selected_objects[0]
+            obj = self.canvas_widget.object_manager.selected_objects.first()
             layer = self.canvas_widget.object_manager.find_layer_of_object(obj)
             if layer:
                 layer_label = t('layer_info').format(name=layer.name)
@@ -439,8 +410,9 @@ class PixelLabFullApp:
         if sel_count >= 2:
             self.context_menu.add_command(label=t('group'), command=self.group_objects)
         
-        from src.vector_objects import VectorGroup
-        has_groups = any(isinstance(obj, VectorGroup) for obj in self.canvas_widget.object_manager.selected_objects)
+        from src.vector_objects import VectorGroup, VectorInstance
+        has_groups = any(isinstance(obj, (VectorGroup, VectorInstance))
+                         for obj in self.canvas_widget.object_manager.selected_objects)
         if has_groups:
             self.context_menu.add_command(label=t('ungroup'), command=self.ungroup_objects)
         
@@ -460,15 +432,13 @@ class PixelLabFullApp:
     def _zoom_in(self):
         """Zoom in"""
         self.canvas_widget.zoom_level = min(100, self.canvas_widget.zoom_level * 1.2)
-        self.canvas_widget.need_render = True
-        self.canvas_widget.render()
+        self.canvas_widget.force_render()
         self.zoom_label.config(text=f"{int(self.canvas_widget.zoom_level)}x")
     
     def _zoom_out(self):
         """Zoom out"""
         self.canvas_widget.zoom_level = max(0.5, self.canvas_widget.zoom_level / 1.2)
-        self.canvas_widget.need_render = True
-        self.canvas_widget.render()
+        self.canvas_widget.force_render()
         self.zoom_label.config(text=f"{int(self.canvas_widget.zoom_level)}x")
         
     def show_shortcuts(self):
@@ -603,7 +573,7 @@ class PixelLabFullApp:
             self.canvas_widget.resize_canvas(size, size)
             self.canvas_widget.object_manager.clear()
             self.layer_panel.refresh_list()
-            self.canvas_widget.render()
+            self.canvas_widget.force_render()
             self.current_file = None
             self.modified = False
             self._update_title()
@@ -632,7 +602,7 @@ class PixelLabFullApp:
                     self.palette.from_hex_list(data['palette'])
                     self.color_picker.refresh()
                 
-                self.canvas_widget.render()
+                self.canvas_widget.force_render()
                 self.current_file = filepath
                 self.modified = False
                 self._update_title()
@@ -671,11 +641,11 @@ class PixelLabFullApp:
     
     def import_image(self):
         """Import image"""
-        def on_import_complete(group):
-            if group:
-                self.canvas_widget.object_manager.add_object(group)
-                self.canvas_widget.render()
-                self._update_status(f"{t('imported')}: {len(group.objects)} {t('objects')}")
+        def on_import_complete(bitmap):
+            if bitmap:
+                self.canvas_widget.object_manager.add_object(bitmap)
+                self.canvas_widget.force_render()
+                self._update_status(f"{t('imported')}: {bitmap.width}x{bitmap.height}")
         
         ImageImporter.import_image(
             self.root,
@@ -722,7 +692,7 @@ class PixelLabFullApp:
         group = self.canvas_widget.object_manager.group_selected()
         if group:
             print(f"[DEBUG] Created group with {len(group.objects)} objects")
-            self.canvas_widget.render()
+            self.canvas_widget.force_render()
             self.modified = True
             self._update_status(f"{t('grouped')}: {len(group.objects)} {t('objects')}")
             self.layer_panel.refresh_list()
@@ -737,7 +707,7 @@ class PixelLabFullApp:
         count = self.canvas_widget.object_manager.ungroup_selected()
         print(f"[DEBUG] Ungrouped {count} objects")
         if count > 0:
-            self.canvas_widget.render()
+            self.canvas_widget.force_render()
             self.modified = True
             self._update_status(f"{t('ungrouped')}: {count} {t('objects')}")
             self.layer_panel.refresh_list()
@@ -745,6 +715,24 @@ class PixelLabFullApp:
         else:
             print("[DEBUG] No groups to ungroup")
     
+    def create_symbol(self):
+        """Turn the selection into a symbol with one instance in its place"""
+        instance = self.canvas_widget.object_manager.create_symbol_from_selected()
+        if instance:
+            self.canvas_widget.force_render()
+            self.modified = True
+            self._update_status(self.canvas_widget.object_manager.logs[-1]['message'])
+            self.layer_panel.refresh_list()
+    
+    def duplicate_objects(self):
+        """Duplicate the selection one pixel down-right (symbol instances stay shared)"""
+        copies = self.canvas_widget.object_manager.duplicate_selected(1, 1)
+        if copies:
+            self.canvas_widget.force_render()
+            self.modified = True
+            self._update_status(self.canvas_widget.object_manager.logs[-1]['message'])
+            self.layer_panel.refresh_list()
+    
     def reorder_up(self):
         """Bring forward"""
         if self.canvas_widget.object_manager.move_selected_up():
@@ -769,10 +757,17 @@ class PixelLabFullApp:
             self.canvas_widget.force_render()
             self.modified = True
 
+    def select_all(self):
+        """Select all objects in unlocked layers"""
+        self.canvas_widget.object_manager.select_all()
+        self.canvas_widget.force_render()
+        sel_count = len(self.canvas_widget.object_manager.selected_objects)
+        self._update_status(f"{sel_count} {t('selected')}")
+    
     def delete_selected(self):
         """Delete selected objects"""
         self.canvas_widget.object_manager.delete_selected()
-        self.canvas_widget.render()
+        self.canvas_widget.force_render()
         self._update_status(t('ready'))
     
     def change_selected_color(self):
@@ -803,13 +798,54 @@ class PixelLabFullApp:
             count = self.canvas_widget.object_manager.change_selected_color(new_color)
             print(f"[DEBUG] Changed {count} objects")
             
-            # Force re-render by setting need_render flag
-            self.canvas_widget.need_render = True
-            self.canvas_widget.render()
+            self.canvas_widget.force_render()
             print("[DEBUG] Canvas rendered")
             
             self._update_status(t('changed_color_objs').format(count=count))
     
+    def new_tilemap_layer(self):
+        """Add a tilemap layer covering the canvas, with a tileset atlas loaded from an image file"""
+        from PIL import Image
+        filepath = filedialog.askopenfilename(
+            title=t('new_tilemap_layer'),
+            filetypes=[("Images", "*.png *.gif *.bmp"), ("All Files", "*.*")]
+        )
+        if not filepath:
+            return
+        cell_size = simpledialog.askinteger(t('new_tilemap_layer'), t('tile_size_prompt'),
+                                            initialvalue=16, minvalue=1, maxvalue=256)
+        if not cell_size:
+            return
+        try:
+            tileset = Image.open(filepath).convert('RGBA')
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load tileset:\n{e}")
+            return
+        cols = -(-self.canvas_widget.width // cell_size)
+        rows = -(-self.canvas_widget.height // cell_size)
+        self.canvas_widget.object_manager.add_tilemap_layer(tileset, cell_size, cols, rows)
+        self.layer_panel.refresh_list()
+        self.canvas_widget.force_render()
+        self.modified = True
+        self.select_tool("Tile")
+    
+    def choose_tile(self):
+        """Choose the tile index the Tile tool paints (0 erases)"""
+        index = simpledialog.askinteger(t('choose_tile'), t('tile_index_prompt'),
+                                        initialvalue=self.current_tile, minvalue=0, maxvalue=65535)
+        if index is not None:
+            self.current_tile = index
+            if hasattr(self.canvas_widget.current_tool, 'tile_index'):
+                self.canvas_widget.current_tool.tile_index = index
+    
+    def toggle_indexed_mode(self):
+        """Switch the document between RGBA and indexed (colour table) mode"""
+        manager = self.canvas_widget.object_manager
+        manager.set_indexed(not manager.indexed)
+        self.canvas_widget.force_render()
+        self.modified = True
+        self._update_status(manager.logs[-1]['message'])
+    
     def clear_canvas(self):
         """Clear canvas"""
         if messagebox.askyesno(t('ask_clear_title'), t('ask_clear_canvas')):
@@ -39,7 +39,7 @@ class PixelLabVectorApp:
         self._create_menu()
         
         # Canvas
-        self.canvas_widget = VectorCanvas(root, width=32, height=32)
+        self.canvas_widget = VectorCanvas(root, width=32, height=32, on_change=self._on_canvas_change)
         
         # Tools
         self.tools = {
@@ -53,7 +53,7 @@ class PixelLabVectorApp:
             "Circle": VectorCircleTool(self.current_color, False),
         }
         
-        self.current_tool = self.tools["Mouse"]
+        self.select_tool("Mouse")
         
         # Bind events
         self._bind_events()
@@ -112,10 +112,9 @@ class PixelLabVectorApp:
     
     def _bind_events(self):
         """Bind keyboard and mouse events"""
-        # Mouse events
-        self.canvas_widget.canvas.bind("<ButtonPress-1>", self._on_mouse_press)
-        self.canvas_widget.canvas.bind("<B1-Motion>", self._on_mouse_drag)
-        self.canvas_widget.canvas.bind("<ButtonRelease-1>", self._on_mouse_release)
+        # Mouse events: the canvas runs the tool (overlay previews, scheduled frames),
+        # the app only follows the pointer for the status line
+        self.canvas_widget.canvas.bind("<B1-Motion>", self._on_mouse_drag, add="+")
         
         # Keyboard shortcuts
         self.root.bind("<F1>", lambda e: self.toggle_language())
@@ -140,6 +139,9 @@ class PixelLabVectorApp:
         if name in self.tools:
             self.current_tool = self.tools[name]
             self.current_tool.set_color(self.current_color)
+            self.canvas_widget.current_tool = self.current_tool
+            self.canvas_widget.current_tool_name = name
+            self.canvas_widget.canvas.config(cursor=self.current_tool.get_cursor())
             self._update_status(f"{t('tool')}: {t(name.lower())}")
     
     def toggle_grid(self):
@@ -156,11 +158,11 @@ class PixelLabVectorApp:
     
     def import_image(self):
         """Import image"""
-        def on_import_complete(group):
-            if group:
-                self.canvas_widget.object_manager.add_object(group)
-                self.canvas_widget.render()
-                self._update_status(f"{t('imported')}: {len(group.objects)} {t('objects')}")
+        def on_import_complete(bitmap):
+            if bitmap:
+                self.canvas_widget.object_manager.add_object(bitmap)
+                self.canvas_widget.force_render()
+                self._update_status(f"{t('imported')}: {bitmap.width}x{bitmap.height}")
         
         ImageImporter.import_image(
             self.root,
@@ -173,7 +175,7 @@ class PixelLabVectorApp:
         """Group selected objects"""
         group = self.canvas_widget.object_manager.group_selected()
         if group:
-            self.canvas_widget.render()
+            self.canvas_widget.force_render()
             self._update_status(f"{t('grouped')}: {len(group.objects)} {t('objects')}")
         else:
             messagebox.showinfo("그룹", "2개 이상의 객체를 선택하세요")
@@ -182,13 +184,13 @@ class PixelLabVectorApp:
         """Ungroup selected groups"""
         count = self.canvas_widget.object_manager.ungroup_selected()
         if count > 0:
-            self.canvas_widget.render()
+            self.canvas_widget.force_render()
             self._update_status(f"{t('ungrouped')}: {count} {t('objects')}")
     
     def delete_selected(self):
         """Delete selected objects"""
         self.canvas_widget.object_manager.delete_selected()
-        self.canvas_widget.render()
+        self.canvas_widget.force_render()
         self._update_status(t('ready'))
     
     def clear_canvas(self):
@@ -197,45 +199,21 @@ class PixelLabVectorApp:
             self.canvas_widget.clear()
             self._update_status(t('canvas_cleared'))
     
-    def _on_mouse_press(self, event):
-        """Mouse press"""
-        px, py = self.canvas_widget.screen_to_canvas(event.x, event.y)
-        if 0 <= px < self.canvas_widget.width and 0 <= py < self.canvas_widget.height:
-            self.current_tool.on_press(px, py, self.canvas_widget.object_manager)
-            
-            if hasattr(self.current_tool, 'get_preview_object'):
-                self.canvas_widget.set_preview_object(self.current_tool.get_preview_object())
-            
-            self.canvas_widget.render()
-    
     def _on_mouse_drag(self, event):
         """Mouse drag"""
         px, py = self.canvas_widget.screen_to_canvas(event.x, event.y)
-        self.current_tool.on_drag(px, py, self.canvas_widget.object_manager)
-        
-        if hasattr(self.current_tool, 'get_preview_object'):
-            self.canvas_widget.set_preview_object(self.current_tool.get_preview_object())
-        
-        self.canvas_widget.render()
         self._update_status(f"{t('position')}: ({px}, {py})")
     
-    def _on_mouse_release(self, event):
-        """Mouse release"""
-        px, py = self.canvas_widget.screen_to_canvas(event.x, event.y)
-        self.current_tool.on_release(px, py, self.canvas_widget.object_manager)
-        
-        self.canvas_widget.clear_preview()
-        self.canvas_widget.render()
-        
-        # Update status with selection info
-        obj_count = len(self.canvas_widget.object_manager.objects)
+    def _on_canvas_change(self):
+        """Tool finished an edit"""
+        obj_count = len(self.canvas_widget.object_manager)
         sel_count = len(self.canvas_widget.object_manager.selected_objects)
         self._update_status(f"{obj_count} {t('objects')}, {sel_count} {t('selected')}")
     
     def _update_status(self, message=""):
         """Update status"""
         if not message:
-            obj_count = len(self.canvas_widget.object_manager.objects)
+            obj_count = len(self.canvas_widget.object_manager)
             message = f"{t('ready')} - {obj_count} {t('objects')}"
         
         self.root.title(f"PixeLab v2.1 - {message}")
@@ -0,0 +1,56 @@
+"""
+Floating Selection - Raster sprites of selected objects while they are being dragged
+The selection is rendered once when the drag starts; each frame only blits it at the drag offset
+"""
+from .tile_cache import TileCache, pixel_rect, rects_intersect
+
+
+class FloatingSelection:
+    """Objects lifted out of their layers for a drag, plus one rendered sprite per layer
+
+    The objects keep their original coordinates until the drag is committed with a
+    single translate. Meanwhile offset holds the drag distance, and each layer's
+    sprite tiles (rendered lazily on the render thread) are composited shifted by it,
+    in that layer's place in the stack.
+    """
+
+    def __init__(self, layers, color_table=None):
+        self.layers = {layer: tuple(objs) for layer, objs in layers.items()}  # Layer -> objects in z-order
+        self.objects = tuple(obj for objs in self.layers.values() for obj in objs)
+        self.color_table = color_table  # Set in indexed documents: the sprites hold indices
+        self._members = frozenset(self.objects)
+        self.offset = (0, 0)
+        self._sprites = {}
+
+    def shifted_bounds(self, obj):
+        """Bounds of an object as currently shown: moved by the drag offset if it is floating"""
+        x0, y0, x1, y1 = obj.get_bounds()
+        if obj not in self._members:
+            return (x0, y0, x1, y1)
+        dx, dy = self.offset
+        return (x0 + dx, y0 + dy, x1 + dx, y1 + dy)
+
+    def sprite(self, layer) -> TileCache:
+        """Tiles holding a layer's lifted objects at their original position, rendered on first use"""
+        sprite = self._sprites.get(layer)
+        if sprite is None:
+            objects = self.layers[layer]
+            sprite = TileCache(mode='RGBA' if self.color_table is None else 'P', color_table=self.color_table)
+            rects = [pixel_rect(obj.get_bounds()) for obj in objects]
+            keys = set()
+            for rect in rects:
+                keys.update(sprite.keys_in_rect(rect))
+            for key in keys:
+                full = sprite.tile_rect(key)
+                sprite.repaint(key, full, [obj for obj, rect in zip(objects, rects)
+                                           if rects_intersect(rect, full)])
+            self._sprites[layer] = sprite
+        return sprite
+
+    def composite_onto(self, target, origin, offset, layer):
+        """
+        Alpha-composite a layer's sprite moved by offset onto target, whose top-left sits
+        at canvas point origin. Does nothing for layers with no lifted objects.
+        """
+        if layer in self.layers:
+            self.sprite(layer).composite_onto(target, (origin[0] - offset[0], origin[1] - offset[1]))
@@ -46,7 +46,16 @@ class I18n:
                 'deleted_objs': '{count}개 객체 삭제됨',
                 'grouped_objs': '{count}개 객체 그룹화됨',
                 'ungrouped_objs': '{count}개 객체 그룹 해제됨',
+                'created_symbol': '심볼 생성됨: {name} ({count}개 객체)',
+                'duplicated_objs': '{count}개 객체 복제됨',
                 'changed_color_objs': '{count}개 객체 색상 변경됨',
+                'color_mode_indexed': '인덱스 색상 모드: {count}색',
+                'color_mode_rgba': 'RGBA 색상 모드',
+                'indexed_color_mode': '인덱스 색상 모드 전환',
+                'new_tilemap_layer': '새 타일맵 레이어...',
+                'choose_tile': '타일 선택...',
+                'tile_size_prompt': '타일 크기 (픽셀):',
+                'tile_index_prompt': '타일 번호 (0 = 지우기):',
                 'moved_objs_forward': '객체를 앞으로 보냄',
                 'moved_objs_backward': '객체를 뒤로 보냄',
                 'moved_objs_front': '객체를 맨 앞으로 보냄',
@@ -84,6 +93,7 @@ class I18n:
                 'resizing': '크기 조정 중',
                 'tracing_pixels': '픽셀 추적 중',
                 'creating_group': '그룹 생성 중',
+                'creating_bitmap': '비트맵 생성 중',
                 'import_error': '가져오기 오류',
                 'failed_import': '이미지를 가져오지 못했습니다',
                 
@@ -103,6 +113,8 @@ class I18n:
                 'redo': '다시 실행',
                 'group': '그룹 만들기',
                 'ungroup': '그룹 해제',
+                'create_symbol': '심볼 만들기',
+                'duplicate': '복제',
                 'clear_canvas': '캔버스 지우기',
                 
                 # View menu
@@ -122,6 +134,7 @@ class I18n:
                 'line': '선',
                 'rectangle': '사각형',
                 'circle': '원',
+                'tile': '타일',
                 
                 # Dialog
                 'save_changes': '변경 사항 저장',
@@ -208,7 +221,16 @@ class I18n:
                 'deleted_objs': 'Deleted {count} objects',
                 'grouped_objs': 'Grouped {count} objects',
                 'ungrouped_objs': 'Ungrouped {count} objects',
+                'created_symbol': 'Created symbol: {name} ({count} objects)',
+                'duplicated_objs': 'Duplicated {count} objects',
                 'changed_color_objs': 'Changed color of {count} objects',
+                'color_mode_indexed': 'Indexed color mode: {count} colors',
+                'color_mode_rgba': 'RGBA color mode',
+                'indexed_color_mode': 'Toggle Indexed Color Mode',
+                'new_tilemap_layer': 'New Tilemap Layer...',
+                'choose_tile': 'Choose Tile...',
+                'tile_size_prompt': 'Tile size (pixels):',
+                'tile_index_prompt': 'Tile number (0 = erase):',
                 'moved_objs_forward': 'Moved objects forward',
                 'moved_objs_backward': 'Moved objects backward',
                 'moved_objs_front': 'Moved objects to front',
@@ -247,6 +269,7 @@ class I18n:
                 'resizing': 'Resizing',
                 'tracing_pixels': 'Tracing Pixels',
                 'creating_group': 'Creating Group',
+                'creating_bitmap': 'Creating Bitmap',
                 'import_error': 'Import Error',
                 'failed_import': 'Failed to import image',
                 
@@ -266,6 +289,8 @@ class I18n:
                 'redo': 'Redo',
                 'group': 'Group',
                 'ungroup': 'Ungroup',
+                'create_symbol': 'Create Symbol',
+                'duplicate': 'Duplicate',
                 'clear_canvas': 'Clear Canvas',
                 
                 # View menu
@@ -285,6 +310,7 @@ class I18n:
                 'line': 'Line',
                 'rectangle': 'Rectangle',
                 'circle': 'Circle',
+                'tile': 'Tile',
                 
                 # Dialog
                 'save_changes': 'Save Changes',
@@ -1,11 +1,11 @@
 """
-Image Import - Import bitmap/vector images and trace them to pixel objects
+Image Import - Import bitmap images as VectorBitmap objects
 """
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from PIL import Image
 import threading
-from .vector_objects import VectorPixel, VectorGroup
+from .vector_objects import VectorBitmap
 
 
 class ProgressDialog:
@@ -63,13 +63,13 @@ class ProgressDialog:
 
 
 class ImageImporter:
-    """Import and trace images to vector objects"""
+    """Import images as bitmap objects"""
     
     @staticmethod
     def import_image(parent, canvas_width, canvas_height, on_complete=None):
         """
-        Import image file and convert to vector objects
-        Shows file dialog, progress dialog, and returns VectorGroup
+        Import image file as a bitmap object
+        Shows file dialog, progress dialog, and returns a VectorBitmap
         """
         # File dialog
         from src.i18n import t
@@ -89,7 +89,7 @@ class ImageImporter:
         # Create progress dialog
         progress = ProgressDialog(parent, t('import_image_title'))
         
-        result = {'group': None, 'error': None}
+        result = {'bitmap': None, 'error': None}
         
         def import_thread():
             try:
@@ -116,44 +116,16 @@ class ImageImporter:
                 else:
                     new_width, new_height = orig_width, orig_height
                 
-                # Trace to pixels
-                progress.update(40, t('tracing_pixels'),
-                               t('processing_pixels').format(count=f"{new_width}x{new_height}"))
-                
-                pixels_data = img.load()
-                objects = []
-                total_pixels = new_width * new_height
-                processed = 0
-                
-                for y in range(new_height):
-                    for x in range(new_width):
-                        r, g, b, a = pixels_data[x, y]
-                        
-                        # Skip fully transparent pixels
-                        if a > 0:
-                            obj = VectorPixel(x, y, (r, g, b, a))
-                            objects.append(obj)
-                        
-                        processed += 1
-                        if processed % 100 == 0:
-                            percent = 40 + int((processed / total_pixels) * 50)
-                            progress.update(
-                                percent,
-                                t('tracing_pixels'),
-                                t('processing_pixels').format(count=f"{processed}/{total_pixels}")
-                            )
-                
-                # Create group
-                progress.update(95, t('creating_group'),
-                               t('objects_created').format(count=len(objects)))
+                # One bitmap object holds all pixels
+                progress.update(60, t('creating_bitmap'), f"{new_width}x{new_height}")
                 
                 import os
                 filename = os.path.basename(filepath)
-                group = VectorGroup(objects, f"{t('imported')}: {filename}")
+                bitmap = VectorBitmap(0, 0, img, f"{t('imported')}: {filename}")
                 
-                progress.update(100, t('complete'), f"{t('imported')} {len(objects)} pixels")
+                progress.update(100, t('complete'), f"{t('imported')} {new_width}x{new_height}")
                 
-                result['group'] = group
+                result['bitmap'] = bitmap
                 
             except Exception as e:
                 result['error'] = str(e)
@@ -178,10 +150,10 @@ class ImageImporter:
             return None
         
         # Call callback
-        if on_complete and result['group']:
-            on_complete(result['group'])
+        if on_complete and result['bitmap']:
+            on_complete(result['bitmap'])
         
-        return result['group']
+        return result['bitmap']
     
     @staticmethod
     def quick_import(filepath, canvas_width, canvas_height):
@@ -195,17 +167,7 @@ class ImageImporter:
                 new_size = (int(img.width * scale), int(img.height * scale))
                 img = img.resize(new_size, Image.NEAREST)
             
-            # Trace to pixels
-            pixels_data = img.load()
-            objects = []
-            
-            for y in range(img.height):
-                for x in range(img.width):
-                    r, g, b, a = pixels_data[x, y]
-                    if a > 0:
-                        objects.append(VectorPixel(x, y, (r, g, b, a)))
-            
-            return VectorGroup(objects, f"Imported")
+            return VectorBitmap(0, 0, img, "Imported")
             
         except Exception as e:
             print(f"Import error: {e}")
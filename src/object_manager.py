@@ -2,22 +2,176 @@
 Object Manager - Manages all vector objects
 """
 from typing import List, Optional
+from array import array
+import base64
 import copy
-from .vector_objects import VectorObject, create_object_from_dict
+import io
+import math
+import sys
+import threading
+import zlib
+from .vector_objects import (VectorObject, VectorGroup, Symbol, copy_objects, create_object_from_dict,
+                             expand_image, index_image, next_object_id, symbols_used)
+from .tile_cache import TileCache, pixel_rect, rects_intersect
+from .floating_selection import FloatingSelection
+from .spatial_index import SpatialIndex
+from .selection import Selection
+from .zorder import ZOrderList
+from .palette import ColorTable
 
 
 class Layer:
     """Represents a single layer containing vector objects"""
-    def __init__(self, name="Layer 1"):
+    def __init__(self, name="Layer 1", color_table=None):
         self.name = name
-        self.objects: List[VectorObject] = []
+        self.objects = ZOrderList()  # Bottom to top
         self.visible = True
         self.locked = False
-        self.dirty = True
-        self.cached_image = None
+        self.color_table = color_table  # Document ColorTable in indexed-colour mode, shared by all layers
+        self.tile_cache = self._new_tile_cache()
+        self.id_cache = TileCache(mode='I')  # ID map: topmost object ID per pixel, 0 where empty
+        self.version = 0  # Bumped on every content change, used by composite caches
+        self.floating = frozenset()  # Objects lifted into a FloatingSelection, left out of the tiles
+        self._spatial = None  # SpatialIndex over object bounds, built on first query
+        self._spatial_lock = threading.Lock()  # The render thread queries _spatial while the UI edits it
 
-    def mark_dirty(self):
-        self.dirty = True
+    def __getstate__(self):
+        # Copies (undo history) rebuild their lookup structures on demand
+        state = self.__dict__.copy()
+        state['_spatial'] = None
+        del state['_spatial_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._spatial_lock = threading.Lock()
+
+    def _new_tile_cache(self) -> TileCache:
+        if self.color_table is None:
+            return TileCache()
+        return TileCache(mode='P', color_table=self.color_table)
+
+    def set_color_table(self, color_table):
+        """Switch the layer cache between RGBA and indexed tiles; the objects must already match"""
+        self.color_table = color_table
+        self.tile_cache = self._new_tile_cache()
+        self.mark_dirty()
+
+    def add(self, obj):
+        """Put an object on top and register it for lookups; call mark_dirty separately"""
+        self.objects.append(obj)
+        with self._spatial_lock:
+            if self._spatial is not None:
+                self._spatial.insert(obj)
+
+    def discard(self, obj):
+        """Remove an object and unregister it from lookups; call mark_dirty separately"""
+        self.objects.remove(obj)
+        with self._spatial_lock:
+            if self._spatial is not None:
+                self._spatial.remove(obj)
+
+    def discard_many(self, objs):
+        """Remove several objects; call mark_dirty separately"""
+        for obj in objs:
+            self.discard(obj)
+
+    def moved(self, obj):
+        """Update lookups after an object's geometry changed"""
+        with self._spatial_lock:
+            if self._spatial is not None:
+                self._spatial.update(obj)
+
+    def spatial_index(self) -> SpatialIndex:
+        """The layer's SpatialIndex (UI thread; the render thread goes through objects_near)"""
+        with self._spatial_lock:
+            return self._built_spatial_index()
+
+    def _built_spatial_index(self) -> SpatialIndex:
+        if self._spatial is None:
+            self._spatial = SpatialIndex()
+            for obj in self.objects:
+                self._spatial.insert(obj)
+        return self._spatial
+
+    def objects_near(self, rect) -> set:
+        """Candidate objects whose bounds may overlap the inclusive rect, safe to call from the render thread"""
+        with self._spatial_lock:
+            return self._built_spatial_index().query_rect(rect)
+
+    def object_at(self, x, y) -> Optional[VectorObject]:
+        """Topmost object containing (x, y)"""
+        candidates = [obj for obj in self.spatial_index().query_point(x, y) if obj.contains_point(x, y)]
+        if not candidates:
+            return None
+        return max(candidates, key=self.objects.key)
+
+    def id_at(self, x, y, width, height) -> Optional[int]:
+        """ID of the topmost object painted at canvas pixel (x, y), read from the ID map"""
+        return self.render_id_tiles(width, height).pixel(x, y) or None
+
+    def objects_in_rect(self, rect) -> List[VectorObject]:
+        """Objects whose bounds intersect the inclusive rect (x0, y0, x1, y1), in stacking order"""
+        x0, y0, x1, y1 = rect
+        hits = []
+        for obj in self.spatial_index().query_rect(rect):
+            bx0, by0, bx1, by1 = obj.get_bounds()
+            if bx0 <= x1 and bx1 >= x0 and by0 <= y1 and by1 >= y0:
+                hits.append(obj)
+        hits.sort(key=self.objects.key)
+        return hits
+
+    def mark_dirty(self, bounds=None):
+        """
+        Record bounds as a damage rectangle, or invalidate the whole layer cache if bounds is None.
+        Call this after mutating the objects, so a render thread that takes the damage
+        also sees the change.
+        """
+        self.tile_cache.invalidate(bounds)
+        self.id_cache.invalidate(bounds)
+        self.version += 1
+
+    def render_tiles(self, width, height) -> TileCache:
+        """Repaint damaged tile areas and return the up-to-date tile cache"""
+        return self._repaint_damage(self.tile_cache, width, height)
+
+    def render_id_tiles(self, width, height) -> TileCache:
+        """Repaint damaged areas of the ID map and return it (same damage as the layer cache)"""
+        return self._repaint_damage(self.id_cache, width, height, lambda obj: obj.id)
+
+    def _repaint_damage(self, cache, width, height, ids=None, underlay=None) -> TileCache:
+        damage = cache.take_damage(width, height)
+        if not damage:
+            return cache
+        
+        # Look the objects up only after taking the damage: every recorded change is
+        # already applied, and later changes leave fresh damage for the next frame
+        region = (min(r[0] for r in damage.values()), min(r[1] for r in damage.values()),
+                  max(r[2] for r in damage.values()), max(r[3] for r in damage.values()))
+        # pixel_rect pads bounds by up to 2 pixels, so widen the query to match
+        near = self.objects_near((region[0] - 2, region[1] - 2, region[2] + 1, region[3] + 1))
+        floating = self.floating
+        if floating:
+            near = near - floating
+        objects = self.objects.in_order(near)
+
+        # Collect, in z-order, the objects intersecting each damaged rectangle
+        hits = {key: [] for key in damage}
+        for obj in objects:
+            rect = pixel_rect(obj.get_bounds())
+            if not rects_intersect(rect, region):
+                continue
+            keys = cache.keys_in_rect(rect)
+            if len(keys) > len(damage):
+                keys = damage
+            for key in keys:
+                damaged = damage.get(key)
+                if damaged and rects_intersect(rect, damaged):
+                    hits[key].append(obj)
+
+        for key, rect in damage.items():
+            cache.repaint(key, rect, hits[key], ids, underlay)
+        return cache
 
     def to_dict(self):
         return {
@@ -28,15 +182,161 @@ class Layer:
         }
 
     @staticmethod
-    def from_dict(data):
-        layer = Layer(data.get('name', 'Layer'))
+    def from_dict(data, color_table=None, symbols=None):
+        if data.get('type') == 'tilemap':
+            layer = TilemapLayer.from_tilemap_dict(data, color_table)
+        else:
+            layer = Layer(data.get('name', 'Layer'), color_table)
         layer.visible = data.get('visible', True)
         layer.locked = data.get('locked', False)
         for obj_data in data.get('objects', []):
-            obj = create_object_from_dict(obj_data)
+            obj = create_object_from_dict(obj_data, symbols)
             if obj:
-                layer.objects.append(obj)
-        layer.dirty = True
+                layer.add(obj)
+        return layer
+
+
+class TilemapLayer(Layer):
+    """Layer of grid-aligned tiles: a dense array of tile indices plus a tileset atlas
+
+    Cell (col, row) covers cell_size x cell_size pixels from (col * cell_size,
+    row * cell_size). Index 0 is an empty cell; index n shows the n-th cell of the
+    atlas, counted row by row. Cells are pasted from cached tile images under any
+    vector objects the layer also holds, and setting a cell damages only that cell.
+    """
+    def __init__(self, name="Tilemap", tileset=None, cell_size=16, cols=0, rows=0, color_table=None):
+        super().__init__(name, color_table)
+        self.cell_size = cell_size
+        self.cols = cols
+        self.rows = rows
+        self.cells = array('H', bytes(2 * cols * rows))  # Row-major tile indices
+        self.tileset = None  # Atlas image: RGBA, or 'P' of ColorTable indices in indexed documents
+        self._tile_images = {}  # Tile index -> image cropped from the atlas
+        self.set_tileset(tileset)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_tile_images'] = {}
+        return state
+
+    @property
+    def tile_count(self) -> int:
+        """Number of tiles in the atlas (valid indices are 1..tile_count)"""
+        if self.tileset is None:
+            return 0
+        return (self.tileset.width // self.cell_size) * (self.tileset.height // self.cell_size)
+
+    def set_tileset(self, tileset):
+        """Replace the atlas image; cells keep their indices"""
+        if tileset is not None:
+            if self.color_table is not None:
+                tileset = index_image(tileset.convert('RGBA'), self.color_table)
+            elif tileset.mode != 'RGBA':
+                tileset = tileset.convert('RGBA')
+        self.tileset = tileset
+        self._tile_images = {}
+        self.mark_dirty()
+
+    def set_color_table(self, color_table):
+        if self.tileset is not None:
+            if color_table is not None and self.tileset.mode != 'P':
+                self.tileset = index_image(self.tileset, color_table)
+            elif color_table is None and self.tileset.mode == 'P':
+                self.tileset = expand_image(self.tileset, self.color_table)
+        self._tile_images = {}
+        super().set_color_table(color_table)
+
+    def tile_image(self, index):
+        """Image of a tile index, cropped from the atlas once and cached"""
+        image = self._tile_images.get(index)
+        if image is None:
+            size = self.cell_size
+            per_row = self.tileset.width // size
+            x, y = (index - 1) % per_row * size, (index - 1) // per_row * size
+            image = self._tile_images[index] = self.tileset.crop((x, y, x + size, y + size))
+        return image
+
+    def get_cell(self, col, row) -> int:
+        return self.cells[row * self.cols + col]
+
+    def set_cell(self, col, row, index) -> bool:
+        """Put a tile index (0 clears) into a cell; False if it is outside the map or unchanged"""
+        if not (0 <= col < self.cols and 0 <= row < self.rows and 0 <= index <= self.tile_count):
+            return False
+        i = row * self.cols + col
+        if self.cells[i] == index:
+            return False
+        self.cells[i] = index
+        size = self.cell_size
+        self.tile_cache.invalidate_rect((col * size, row * size, (col + 1) * size, (row + 1) * size))
+        self.version += 1
+        return True
+
+    def cell_at(self, x, y):
+        """(col, row) of the cell containing canvas point (x, y), or None outside the map"""
+        col, row = math.floor(x) // self.cell_size, math.floor(y) // self.cell_size
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return col, row
+        return None
+
+    def render_tiles(self, width, height) -> TileCache:
+        return self._repaint_damage(self.tile_cache, width, height, underlay=self.paint_cells)
+
+    def paint_cells(self, image, rect):
+        """Paste the tiles of the cells overlapping rect into image, whose top-left is canvas point rect[:2]"""
+        if self.tileset is None:
+            return
+        size, cols, cells = self.cell_size, self.cols, self.cells
+        x0, y0, x1, y1 = rect
+        col0, row0 = max(0, x0 // size), max(0, y0 // size)
+        col1, row1 = min(cols, (x1 + size - 1) // size), min(self.rows, (y1 + size - 1) // size)
+        tile_image = self.tile_image
+        for row in range(row0, row1):
+            base = row * cols
+            y = row * size - y0
+            for col in range(col0, col1):
+                index = cells[base + col]
+                if index:
+                    image.paste(tile_image(index), (col * size - x0, y))
+
+    def to_dict(self):
+        """Layer data plus the atlas as a PNG and the cells as zlib-compressed little-endian uint16"""
+        data = super().to_dict()
+        cells = self.cells
+        if sys.byteorder != 'little':
+            cells = array('H', cells)
+            cells.byteswap()
+        buffer = io.BytesIO()
+        if self.tileset is not None:
+            self.tileset.save(buffer, 'PNG', optimize=True)
+        data.update({
+            'type': 'tilemap',
+            'cell_size': self.cell_size,
+            'cols': self.cols,
+            'rows': self.rows,
+            'cells': base64.b64encode(zlib.compress(cells.tobytes())).decode('ascii'),
+            'tileset': base64.b64encode(buffer.getvalue()).decode('ascii') if self.tileset is not None else None
+        })
+        return data
+
+    @staticmethod
+    def from_tilemap_dict(data, color_table=None):
+        """Tilemap part of a layer saved by to_dict (Layer.from_dict adds the common fields and objects)"""
+        from PIL import Image
+        layer = TilemapLayer(data.get('name', 'Tilemap'), None, data['cell_size'],
+                             data['cols'], data['rows'], color_table)
+        cells = array('H')
+        cells.frombytes(zlib.decompress(base64.b64decode(data['cells'])))
+        if sys.byteorder != 'little':
+            cells.byteswap()
+        if len(cells) != layer.cols * layer.rows:
+            raise ValueError("Tilemap cell count does not match its size")
+        layer.cells = cells
+        if data.get('tileset'):
+            tileset = Image.open(io.BytesIO(base64.b64decode(data['tileset'])))
+            tileset.load()
+            # An indexed document saves its atlas as a 'P' image of its own colour table
+            layer.tileset = tileset if color_table is not None else tileset.convert('RGBA')
         return layer
 
 
@@ -44,11 +344,17 @@ class ObjectManager:
     """Manages multiple layers of vector objects"""
     
     def __init__(self):
-        self.layers: List[Layer] = [Layer("Layer 1")]
+        self.layers = [Layer("Layer 1")]
         self.current_layer_index = 0
-        self.selected_objects: List[VectorObject] = []
+        self.selected_objects = Selection()
         self.palette_colors = [] # Store palette in manager for saving
         self.logs = [] # Activity logs
+        # Flattened layers below/above the current layer: name -> (key, image)
+        self._composite_cache = {}
+        # Serializes rasterization between the render thread and synchronous callers
+        self.render_lock = threading.RLock()
+        self.floating: Optional[FloatingSelection] = None  # Selection being dragged
+        self.canvas_size = None  # (width, height), set by the canvas widget; enables ID-map picking
         from src.i18n import t
         self.add_log(t('project_initialized'))
     
@@ -61,6 +367,38 @@ class ObjectManager:
         if len(self.logs) > 100:
             self.logs.pop(0)
 
+    @property
+    def layers(self) -> List[Layer]:
+        return self._layers
+
+    @layers.setter
+    def layers(self, layers: List[Layer]):
+        # Replacing the stack (new project, load, undo) rebuilds the object registry
+        # and adopts the layers' colour mode
+        self._layers = layers
+        self.color_table = layers[0].color_table if layers else None
+        self.objects_by_id = {}  # Persistent object ID -> top-level object
+        self._layer_of = {}  # Top-level object -> layer holding it
+        for layer in layers:
+            for obj in layer.objects:
+                self._register(obj, layer)
+
+    def _register(self, obj: VectorObject, layer: Layer):
+        other = self.objects_by_id.get(obj.id)
+        if other is not None and other is not obj:
+            # Duplicate ID (e.g. a hand-edited file): give this object a fresh one
+            obj.id = next_object_id()
+        self.objects_by_id[obj.id] = obj
+        self._layer_of[obj] = layer
+
+    def _unregister(self, obj: VectorObject):
+        if self.objects_by_id.get(obj.id) is obj:
+            del self.objects_by_id[obj.id]
+        self._layer_of.pop(obj, None)
+
+    def get_object_by_id(self, object_id: int) -> Optional[VectorObject]:
+        return self.objects_by_id.get(object_id)
+
     @property
     def current_layer(self) -> Layer:
         return self.layers[self.current_layer_index]
@@ -76,7 +414,7 @@ class ObjectManager:
     def add_layer(self, name=None):
         if not name:
             name = f"Layer {len(self.layers) + 1}"
-        new_layer = Layer(name)
+        new_layer = Layer(name, self.color_table)
         self.layers.append(new_layer)
         self.current_layer_index = len(self.layers) - 1
         from src.i18n import t
@@ -88,8 +426,8 @@ class ObjectManager:
             name = self.layers[index].name
             # Deselect objects in this layer
             for obj in self.layers[index].objects:
-                if obj in self.selected_objects:
-                    self.selected_objects.remove(obj)
+                self.selected_objects.discard(obj)
+                self._unregister(obj)
             
             del self.layers[index]
             self.current_layer_index = min(self.current_layer_index, len(self.layers) - 1)
@@ -98,30 +436,48 @@ class ObjectManager:
             return True
         return False
 
+    def add_tilemap_layer(self, tileset, cell_size, cols, rows, name=None):
+        """Add a TilemapLayer of cols x rows empty cells on top and make it current"""
+        if not name:
+            name = f"Tilemap {len(self.layers) + 1}"
+        layer = TilemapLayer(name, tileset, cell_size, cols, rows, self.color_table)
+        self.layers.append(layer)
+        self.current_layer_index = len(self.layers) - 1
+        from src.i18n import t
+        self.add_log(t('added_layer').format(name=name))
+        return layer
+
+    def paint_tile(self, x, y, index) -> bool:
+        """Set the current tilemap layer's cell under canvas point (x, y); False if nothing changed"""
+        layer = self.current_layer
+        if not isinstance(layer, TilemapLayer) or layer.locked:
+            return False
+        cell = layer.cell_at(x, y)
+        return cell is not None and layer.set_cell(cell[0], cell[1], index)
+
     def find_layer_of_object(self, obj: VectorObject) -> Optional[Layer]:
         """Find which layer an object belongs to"""
-        for layer in self.layers:
-            if obj in layer.objects:
-                return layer
-        return None
+        return self._layer_of.get(obj)
 
     def add_object(self, obj: VectorObject):
         """Add a vector object to current layer"""
         if not self.current_layer.locked:
-            self.current_layer.objects.append(obj)
-            self.current_layer.mark_dirty()
+            if self.color_table is not None:
+                obj.to_indexed(self.color_table)
+            self.current_layer.add(obj)
+            self._register(obj, self.current_layer)
+            self.current_layer.mark_dirty(obj.get_bounds())
             from src.i18n import t
             self.add_log(t('added_obj').format(type=type(obj).__name__))
     
     def remove_object(self, obj: VectorObject):
         """Remove a vector object from whichever layer it is in"""
-        for layer in self.layers:
-            if not layer.locked and obj in layer.objects:
-                layer.objects.remove(obj)
-                layer.mark_dirty()
-                break
-        if obj in self.selected_objects:
-            self.selected_objects.remove(obj)
+        layer = self._layer_of.get(obj)
+        if layer is not None and not layer.locked:
+            layer.discard(obj)
+            self._unregister(obj)
+            layer.mark_dirty(obj.get_bounds())
+        self.selected_objects.discard(obj)
     
     def clear(self):
         """Clear all layers and objects"""
@@ -131,64 +487,145 @@ class ObjectManager:
         from src.i18n import t
         self.add_log(t('canvas_cleared'))
     
+    def get_objects_in_rect(self, rect) -> List[VectorObject]:
+        """All objects (every layer, bottom to top) whose bounds intersect the inclusive rect"""
+        objs = []
+        for layer in self.layers:
+            objs.extend(layer.objects_in_rect(rect))
+        return objs
+
     def get_object_at(self, x, y) -> Optional[VectorObject]:
-        """Get top object at given position across all visible layers"""
+        """
+        Topmost visible, unlocked object at (x, y). Inside the canvas this reads the
+        layers' ID maps, so it matches the rendered pixels; elsewhere it falls back
+        to geometric hit-testing.
+        """
+        if self.canvas_size:
+            width, height = self.canvas_size
+            px, py = math.floor(x), math.floor(y)
+            if 0 <= px < width and 0 <= py < height:
+                # The ID maps are repainted here, so keep the render thread out meanwhile
+                with self.render_lock:
+                    for layer in reversed(self.layers):
+                        if layer.visible and not layer.locked:
+                            object_id = layer.id_at(px, py, width, height)
+                            if object_id is not None:
+                                return self.objects_by_id.get(object_id)
+                return None
+        return self._get_object_at_geometric(x, y)
+
+    def _get_object_at_geometric(self, x, y) -> Optional[VectorObject]:
+        """Get top object at given position across all visible layers using the spatial index"""
         # Check from top layer to bottom layer, and top object to bottom object within layer
         for layer in reversed(self.layers):
             if layer.visible and not layer.locked:
-                for obj in reversed(layer.objects):
-                    if obj.contains_point(x, y):
-                        return obj
+                obj = layer.object_at(x, y)
+                if obj is not None:
+                    return obj
         return None
     
     def select_object(self, obj: VectorObject):
         """Select an object"""
         if obj and obj not in self.selected_objects:
-            obj.selected = True
-            self.selected_objects.append(obj)
+            self.selected_objects.add(obj)
+    
+    def select_all(self):
+        """Select every object in the unlocked layers"""
+        for layer in self.layers:
+            if not layer.locked:
+                for obj in layer.objects:
+                    self.selected_objects.add(obj)
     
     def deselect_object(self, obj: VectorObject):
         """Deselect an object"""
-        if obj in self.selected_objects:
-            obj.selected = False
-            self.selected_objects.remove(obj)
+        self.selected_objects.discard(obj)
     
     def deselect_all(self):
         """Deselect all objects"""
-        for layer in self.layers:
-            for obj in layer.objects:
-                obj.selected = False
         self.selected_objects.clear()
     
     def delete_selected(self):
         """Delete all selected objects from their respective layers"""
         deleted_count = len(self.selected_objects)
-        for obj in self.selected_objects:
-            for layer in self.layers:
-                if not layer.locked and obj in layer.objects:
-                    layer.objects.remove(obj)
-                    layer.mark_dirty()
-                    break
+        for layer, objs in self._selected_by_layer().items():
+            if not layer.locked:
+                self._discard_from(layer, objs)
         self.selected_objects.clear()
         if deleted_count > 0:
             from src.i18n import t
             self.add_log(t('deleted_objs').format(count=deleted_count))
     
+    def _selected_by_layer(self):
+        """Selected top-level objects grouped by the layer holding them (layer -> list)"""
+        by_layer = {}
+        for obj in self.selected_objects:
+            layer = self._layer_of.get(obj)
+            if layer is not None:
+                by_layer.setdefault(layer, []).append(obj)
+        return by_layer
+
+    def _discard_from(self, layer, objs):
+        """Remove objects from a layer in one pass, unregister them and damage their bounds"""
+        layer.discard_many(objs)
+        for obj in objs:
+            self._unregister(obj)
+            layer.mark_dirty(obj.get_bounds())
+
     def translate_selected(self, dx, dy):
         """Move all selected objects"""
         for obj in self.selected_objects:
             # Only move if its layer is not locked
-            is_locked = False
-            for layer in self.layers:
-                if obj in layer.objects:
-                    if layer.locked:
-                        is_locked = True
-                    else:
-                        layer.mark_dirty()
-                    break
-            if not is_locked:
+            owner = self._layer_of.get(obj)
+            if owner is not None and not owner.locked:
+                before = obj.get_bounds()
                 obj.translate(dx, dy)
+                owner.moved(obj)
+                owner.mark_dirty(before)
+                owner.mark_dirty(obj.get_bounds())
     
+    def begin_floating(self) -> Optional[FloatingSelection]:
+        """
+        Lift the selected objects out of their (unlocked) layers for a drag.
+        The layers re-render once without them and frames show them as a sprite
+        until end_floating commits the move.
+        """
+        if self.floating is not None:
+            return self.floating
+        
+        lifted = {}
+        for layer, objs in self._selected_by_layer().items():
+            if layer.locked:
+                continue
+            # Keep layer z-order so each sprite stacks like its layer did
+            objs.sort(key=layer.objects.key)
+            layer.floating = frozenset(objs)
+            for obj in objs:
+                layer.mark_dirty(obj.get_bounds())
+            lifted[layer] = objs
+        
+        if not lifted:
+            return None
+        self.floating = FloatingSelection(lifted, self.color_table)
+        return self.floating
+
+    def end_floating(self):
+        """Put the floating objects back into their layers, translated by the drag offset"""
+        floating = self.floating
+        if floating is None:
+            return
+        self.floating = None
+        
+        dx, dy = floating.offset
+        for layer in self.layers:
+            lifted, layer.floating = layer.floating, frozenset()
+            for obj in lifted:
+                before = obj.get_bounds()
+                if dx or dy:
+                    obj.translate(dx, dy)
+                    layer.moved(obj)
+                layer.mark_dirty(before)
+                layer.mark_dirty(obj.get_bounds())
+
     def group_selected(self):
         """Group selected objects as a single group in the current layer"""
         if len(self.selected_objects) < 2:
@@ -197,20 +634,17 @@ class ObjectManager:
         from .vector_objects import VectorGroup
         
         # Create group
-        group = VectorGroup(self.selected_objects.copy(), f"Group {len(self.all_objects)}")
+        group = VectorGroup(self.selected_objects.copy(), f"Group {len(self)}")
         count = len(self.selected_objects)
         
         # Remove individual objects from their original layers
-        for obj in self.selected_objects:
-            for layer in self.layers:
-                if obj in layer.objects:
-                    layer.objects.remove(obj)
-                    layer.mark_dirty()
-                    break
+        for layer, objs in self._selected_by_layer().items():
+            self._discard_from(layer, objs)
         
         # Add group to CURRENT layer
-        self.current_layer.objects.append(group)
-        self.current_layer.mark_dirty()
+        self.current_layer.add(group)
+        self._register(group, self.current_layer)
+        self.current_layer.mark_dirty(group.get_bounds())
         
         # Select group
         self.selected_objects.clear()
@@ -220,29 +654,86 @@ class ObjectManager:
         self.add_log(t('grouped_objs').format(count=count))
         return group
     
+    def create_symbol_from_selected(self, name=None):
+        """
+        Turn the selected objects into a Symbol definition and put a single instance
+        of it in the current layer, where the objects were
+        """
+        from .vector_objects import VectorInstance
+        
+        by_layer = self._restackable_by_layer()
+        objects = [obj for layer in self.layers for obj in by_layer.get(layer, ())]
+        if not objects or self.current_layer.locked:
+            return None
+        
+        # Symbol coordinates start at the motif's top-left pixel, which becomes the instance offset
+        bounds = [obj.get_bounds() for obj in objects]
+        x = math.floor(min(b[0] for b in bounds))
+        y = math.floor(min(b[1] for b in bounds))
+        for layer, objs in by_layer.items():
+            self._discard_from(layer, objs)
+        for obj in objects:
+            obj.translate(-x, -y)
+            obj.bake_transform()
+        
+        symbol = Symbol(objects, name or f"Symbol {len(symbols_used(self)) + 1}")
+        # The objects already hold colour table indices in an indexed document
+        symbol.indexed = self.color_table is not None
+        instance = VectorInstance(symbol, x, y)
+        self.current_layer.add(instance)
+        self._register(instance, self.current_layer)
+        self.current_layer.mark_dirty(instance.get_bounds())
+        
+        self.selected_objects.clear()
+        self.select_object(instance)
+        from src.i18n import t
+        self.add_log(t('created_symbol').format(name=symbol.name, count=len(objects)))
+        return instance
+    
+    def duplicate_selected(self, dx=0, dy=0):
+        """
+        Copy the selected objects into their layers, moved by (dx, dy), and select the
+        copies. Copied instances keep referencing the same symbols, so a duplicated
+        motif shares its geometry instead of deep-copying it.
+        """
+        copies = []
+        for layer, objs in self._restackable_by_layer().items():
+            for dup in copy_objects(objs):
+                if dx or dy:
+                    dup.translate(dx, dy)
+                layer.add(dup)
+                self._register(dup, layer)
+                layer.mark_dirty(dup.get_bounds())
+                copies.append(dup)
+        
+        self.selected_objects.clear()
+        for dup in copies:
+            self.select_object(dup)
+        if copies:
+            from src.i18n import t
+            self.add_log(t('duplicated_objs').format(count=len(copies)))
+        return copies
+    
     def ungroup_selected(self):
-        """Ungroup selected groups into the layer they belong to"""
-        from .vector_objects import VectorGroup
+        """Ungroup selected groups (and symbol instances, as independent copies) into their layer"""
+        from .vector_objects import VectorGroup, VectorInstance
         
         new_objects = []
         groups_ungrouped = 0
         
         for obj in self.selected_objects.copy():
-            if isinstance(obj, VectorGroup):
-                # Find which layer it's in
-                target_layer = None
-                for layer in self.layers:
-                    if obj in layer.objects:
-                        target_layer = layer
-                        break
-                
+            if isinstance(obj, (VectorGroup, VectorInstance)):
+                target_layer = self._layer_of.get(obj)
                 if target_layer and not target_layer.locked:
-                    target_layer.objects.remove(obj)
-                    target_layer.mark_dirty()
+                    target_layer.discard(obj)
+                    self._unregister(obj)
                     ungrouped = obj.ungroup()
-                    target_layer.objects.extend(ungrouped)
+                    for sub_obj in ungrouped:
+                        target_layer.add(sub_obj)
+                        self._register(sub_obj, target_layer)
+                    target_layer.mark_dirty(obj.get_bounds())
                     new_objects.extend(ungrouped)
-                    self.selected_objects.remove(obj)
+                    self.selected_objects.discard(obj)
                     groups_ungrouped += 1
         
         # Select ungrouped objects
@@ -256,46 +747,102 @@ class ObjectManager:
         return len(new_objects)
     
     def change_selected_color(self, new_color):
-        """Change color of selected objects and groups"""
+        """Change color of selected objects and of the objects inside selected groups
+
+        Objects that are not drawn in their own color (bitmaps, and symbol instances, whose
+        definition other instances share) are left alone and not counted.
+        """
+        if self.color_table is not None:
+            # Every selected object gets the same index; other users of their old colours keep them
+            new_color = self.color_table.index_of(new_color)
         count = 0
-        modified_layers = set()
         for obj in self.selected_objects:
             # Find layer
             layer = self.find_layer_of_object(obj)
             if layer and not layer.locked:
-                modified_layers.add(layer)
-                from .vector_objects import VectorGroup
-                if isinstance(obj, VectorGroup):
-                    for sub_obj in obj.objects:
-                        if hasattr(sub_obj, 'color'):
-                            sub_obj.color = new_color
-                            count += 1
-                elif hasattr(obj, 'color'):
-                    obj.color = new_color
-                    count += 1
-        
-        for layer in modified_layers:
-            layer.mark_dirty()
-            
+                changed = self._recolor(obj, new_color)
+                if changed:
+                    count += changed
+                    layer.mark_dirty(obj.get_bounds())
+        
         if count > 0:
             from src.i18n import t
             self.add_log(t('changed_color_objs').format(count=count))
         return count
     
+    def _recolor(self, obj, color) -> int:
+        """Set the color of obj, or of every object in a group; returns how many objects changed"""
+        if isinstance(obj, VectorGroup):
+            return sum(self._recolor(sub_obj, color) for sub_obj in obj.objects)
+        if not obj.recolorable:
+            return 0
+        obj.color = color
+        return 1
+    
+    @property
+    def indexed(self) -> bool:
+        """Whether the document is in indexed-colour mode"""
+        return self.color_table is not None
+
+    def set_indexed(self, indexed: bool):
+        """
+        Switch between RGBA and indexed colour. Going indexed builds a ColorTable from
+        the colours in use (at most 255; further colours map to the nearest entry)
+        and stores every object colour as an index into it.
+        """
+        if indexed == self.indexed:
+            return
+        with self.render_lock:
+            if indexed:
+                table = ColorTable()
+                for obj in self:
+                    obj.to_indexed(table)
+            else:
+                for obj in self:
+                    obj.to_rgba(self.color_table)
+                table = None
+            for layer in self.layers:
+                layer.set_color_table(table)
+            self.color_table = table
+        from src.i18n import t
+        if table is None:
+            self.add_log(t('color_mode_rgba'))
+        else:
+            self.add_log(t('color_mode_indexed').format(count=len(table) - 1))
+
+    def set_palette_color(self, index, color):
+        """
+        Recolour every object using a colour table entry. Only the table changes:
+        the layer tiles keep their indices and are expanded with the new colour on
+        the next composite.
+        """
+        with self.render_lock:
+            self.color_table.set_color(index, color)
+            for layer in self.layers:
+                layer.version += 1  # Recomposite without repainting any tile
+
+    def _restackable_by_layer(self):
+        """Selected objects in unlocked layers, grouped by layer and sorted bottom to top"""
+        by_layer = {}
+        for layer, objs in self._selected_by_layer().items():
+            if not layer.locked:
+                by_layer[layer] = sorted(objs, key=layer.objects.key)
+        return by_layer
+
     def move_selected_up(self):
         """Move selected objects one step forward in their layers"""
         modified = False
-        for layer in self.layers:
-            if layer.locked: continue
-            
-            # Find indices of selected objects in this layer
-            indices = [i for i, obj in enumerate(layer.objects) if obj in self.selected_objects]
-            # Process from top to bottom to avoid index shifting issues
-            for i in reversed(indices):
-                if i < len(layer.objects) - 1:
-                    layer.objects[i], layer.objects[i+1] = layer.objects[i+1], layer.objects[i]
-                    modified = True
-                    layer.mark_dirty()
+        for layer, objs in self._restackable_by_layer().items():
+            # Top to bottom, so a selected object stuck under another one stays below it
+            blocked = set()
+            for obj in reversed(objs):
+                above = layer.objects.above(obj)
+                if above is None or above in blocked:
+                    blocked.add(obj)
+                    continue
+                layer.objects.move_up(obj)
+                layer.mark_dirty(obj.get_bounds())
+                modified = True
         
         if modified:
             from src.i18n import t
@@ -305,16 +852,17 @@ class ObjectManager:
     def move_selected_down(self):
         """Move selected objects one step backward in their layers"""
         modified = False
-        for layer in self.layers:
-            if layer.locked: continue
-            
-            indices = [i for i, obj in enumerate(layer.objects) if obj in self.selected_objects]
-            # Process from bottom to top
-            for i in indices:
-                if i > 0:
-                    layer.objects[i], layer.objects[i-1] = layer.objects[i-1], layer.objects[i]
-                    modified = True
-                    layer.mark_dirty()
+        for layer, objs in self._restackable_by_layer().items():
+            # Bottom to top, mirroring move_selected_up
+            blocked = set()
+            for obj in objs:
+                below = layer.objects.below(obj)
+                if below is None or below in blocked:
+                    blocked.add(obj)
+                    continue
+                layer.objects.move_down(obj)
+                layer.mark_dirty(obj.get_bounds())
+                modified = True
         
         if modified:
             from src.i18n import t
@@ -324,18 +872,12 @@ class ObjectManager:
     def move_selected_to_front(self):
         """Move selected objects to the very front of their layers"""
         modified = False
-        for layer in self.layers:
-            if layer.locked: continue
-            
-            selected_in_layer = [obj for obj in layer.objects if obj in self.selected_objects]
-            if not selected_in_layer: continue
-            
-            # Remove and re-append at the end
-            for obj in selected_in_layer:
-                layer.objects.remove(obj)
-            layer.objects.extend(selected_in_layer)
+        for layer, objs in self._restackable_by_layer().items():
+            # Bottom to top keeps the selection's relative order
+            for obj in objs:
+                layer.objects.move_to_front(obj)
+                layer.mark_dirty(obj.get_bounds())
             modified = True
-            layer.mark_dirty()
             
         if modified:
             from src.i18n import t
@@ -345,73 +887,140 @@ class ObjectManager:
     def move_selected_to_back(self):
         """Move selected objects to the very back of their layers"""
         modified = False
-        for layer in self.layers:
-            if layer.locked: continue
-            
-            selected_in_layer = [obj for obj in layer.objects if obj in self.selected_objects]
-            if not selected_in_layer: continue
-            
-            # Remove and re-insert at the beginning
-            for obj in reversed(selected_in_layer):
-                layer.objects.remove(obj)
-                layer.objects.insert(0, obj)
+        for layer, objs in self._restackable_by_layer().items():
+            for obj in reversed(objs):
+                layer.objects.move_to_back(obj)
+                layer.mark_dirty(obj.get_bounds())
             modified = True
-            layer.mark_dirty()
             
         if modified:
             from src.i18n import t
             self.add_log(t('moved_objs_back'))
         return modified
 
-    def rasterize(self, width, height) -> 'Image.Image':
+    def snapshot_layers(self):
+        """
+        Immutable view of the layer stack for rendering on another thread:
+        (current index, ((layer, version, visible), ...)). Versions are captured
+        before any damage is taken, so a change racing with a frame is picked up
+        by the next one.
+        """
+        layers = tuple((layer, layer.version, layer.visible) for layer in self.layers)
+        return (min(self.current_layer_index, len(layers) - 1), layers)
+
+    def rasterize(self, width, height, region=None, snapshot=None, floating=None) -> 'Image.Image':
         """
         Extreme Optimized Rasterization
-        - Uses layer caching (only re-renders modified layers)
-        - Uses PIL's native alpha_composite for fast blending
+        - Uses tiled layer caching (only re-renders tiles touched by an edit)
+        - Caches the flattened layers below and above the current layer, so a frame
+          spent editing one layer costs at most two composites
+        - region (x0, y0, x1, y1) limits the result to a sub-rectangle of the canvas
+        - snapshot (from snapshot_layers) lets a render thread work from a fixed layer stack
+        - floating (FloatingSelection, offset) is drawn while dragging, each lifted object
+          over the layer it came from
         """
         from PIL import Image
         
-        # Create base composition image
-        comp_img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        region = region or (0, 0, width, height)
+        index, layers = snapshot or self.snapshot_layers()
+        sprite, offset = floating or (None, None)
         
-        for layer in self.layers:
-            if not layer.visible:
-                continue
+        # Layers from the current one out to any layer with floating objects are composited
+        # one by one, so each sprite lands in its layer's slot; the rest use the cached composites
+        first = last = index
+        if sprite is not None:
+            lifted = [i for i, (layer, _version, _visible) in enumerate(layers) if layer in sprite.layers]
+            first, last = min(lifted + [index]), max(lifted + [index])
+        
+        with self.render_lock:
+            below = self._flattened('below', layers[:first], width, height)
+            if below is not None:
+                comp_img = below.crop(region)
+            else:
+                x0, y0, x1, y1 = region
+                comp_img = Image.new('RGBA', (x1 - x0, y1 - y0), (0, 0, 0, 0))
             
-            # Check if layer needs re-rendering
-            if layer.dirty or layer.cached_image is None or layer.cached_image.size != (width, height):
-                # Create layer image
-                layer_img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-                
-                # Render objects in this layer
-                from PIL import ImageDraw
-                draw = ImageDraw.Draw(layer_img)
-                for obj in layer.objects:
-                    obj.draw_to_image(draw)
-                
-                layer.cached_image = layer_img
-                layer.dirty = False
+            for layer, _version, visible in layers[first:last + 1]:
+                if visible:
+                    layer.render_tiles(width, height).composite_onto(comp_img, region[:2])
+                    if sprite is not None:
+                        sprite.composite_onto(comp_img, region[:2], offset, layer)
             
-            # Composite layer using PIL's fast C-implemented alpha_composite
-            comp_img = Image.alpha_composite(comp_img, layer.cached_image)
+            above = self._flattened('above', layers[last + 1:], width, height)
+            if above is not None:
+                comp_img.alpha_composite(above, (0, 0), region)
         
         return comp_img
 
+    def pixel_at(self, x, y, width, height):
+        """Composited RGBA colour of canvas pixel (x, y), read from the layer tiles without a full rasterize"""
+        from PIL import Image
+        
+        pixel = Image.new('RGBA', (1, 1), (0, 0, 0, 0))
+        with self.render_lock:
+            for layer in self.layers:
+                if layer.visible:
+                    value = layer.render_tiles(width, height).pixel(x, y)
+                    if value and value[3]:
+                        pixel.alpha_composite(Image.new('RGBA', (1, 1), value))
+        return pixel.getpixel((0, 0))
+
+    def _flattened(self, name, layers, width, height) -> Optional['Image.Image']:
+        """
+        Full-canvas composite of the given layers (None if empty), reused until one of them
+        changes or is shown/hidden. Callers crop it per frame, so panning and zooming keep it.
+        """
+        from PIL import Image
+        
+        key = (width, height, layers)
+        cached = self._composite_cache.get(name)
+        if cached and cached[0] == key:
+            return cached[1]
+        
+        flat = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        for layer, _version, visible in layers:
+            if visible:
+                layer.render_tiles(width, height).composite_onto(flat)
+        if flat.getbbox() is None:
+            flat = None
+        
+        self._composite_cache[name] = (key, flat)
+        return flat
+
+    def bake_transforms(self):
+        """Write pending (lazy) object translations into their geometry, e.g. before saving"""
+        with self.render_lock:
+            for layer in self.layers:
+                for obj in layer.objects:
+                    obj.bake_transform()
+
     def to_dict(self) -> dict:
         """Serialize to dictionary including layers and palette"""
-        return {
+        self.bake_transforms()
+        data = {
             'layers': [layer.to_dict() for layer in self.layers],
             'current_layer_index': self.current_layer_index,
             'palette': self.palette_colors,
             'logs': self.logs
         }
+        if self.color_table is not None:
+            data['color_table'] = self.color_table.to_list()
+        symbols = symbols_used(self)
+        if symbols:
+            data['symbols'] = [symbol.to_dict() for symbol in symbols]
+        return data
     
     def from_dict(self, data: dict):
         """Deserialize from dictionary"""
         self.selected_objects.clear()
         
         if 'layers' in data:
-            self.layers = [Layer.from_dict(l_data) for l_data in data['layers']]
+            table = ColorTable.from_list(data['color_table']) if 'color_table' in data else None
+            symbols = {}
+            for s_data in data.get('symbols', []):
+                symbol = Symbol.from_dict(s_data, symbols)
+                symbols[symbol.id] = symbol
+            self.layers = [Layer.from_dict(l_data, table, symbols) for l_data in data['layers']]
             self.current_layer_index = data.get('current_layer_index', 0)
         else:
             # Legacy format support
@@ -419,7 +1028,7 @@ class ObjectManager:
             for obj_data in data.get('objects', []):
                 obj = create_object_from_dict(obj_data)
                 if obj:
-                    legacy_layer.objects.append(obj)
+                    legacy_layer.add(obj)
             self.layers = [legacy_layer]
             self.current_layer_index = 0
             
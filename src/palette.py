@@ -61,3 +61,87 @@ class ColorPalette:
     
     def __iter__(self):
         return iter(self.colors)
+
+
+TRANSPARENT = (0, 0, 0, 0)
+
+
+class ColorTable:
+    """Colour table of a document in indexed-colour mode
+
+    Objects store an index into the table instead of an RGBA tuple, and layer tiles
+    are 'P' images of indices, so editing an entry recolours everything that uses it
+    without touching a single object. Index 0 is transparent (empty tile pixels).
+    """
+    MAX_COLORS = 256
+    
+    def __init__(self, colors=()):
+        self.colors = [TRANSPARENT]
+        self.version = 0  # Bumped when an entry changes, so tile caches refresh their palettes
+        self._indices = {TRANSPARENT: 0}  # RGBA -> index, including nearest matches once full
+        self._palette = None  # Cached putpalette() data
+        for color in colors:
+            self.colors.append(tuple(color))
+        self._reindex()
+    
+    def __len__(self):
+        return len(self.colors)
+    
+    def __getitem__(self, index):
+        return self.colors[index]
+    
+    def index_of(self, color) -> int:
+        """Index of an RGBA colour, added if missing; once the table is full the nearest entry is used"""
+        if isinstance(color, int):
+            return color
+        color = tuple(color)
+        index = self._indices.get(color)
+        if index is None:
+            if len(self.colors) < self.MAX_COLORS:
+                index = len(self.colors)
+                self.colors.append(color)
+                self._palette = None
+            else:
+                index = self._nearest(color)
+            self._indices[color] = index
+        return index
+    
+    def resolve(self, color) -> tuple:
+        """RGBA tuple for an index (or an RGBA colour, returned as is)"""
+        if isinstance(color, int):
+            return self.colors[color]
+        return tuple(color)
+    
+    def set_color(self, index, color):
+        """Change an entry; every object using the index shows the new colour"""
+        if index == 0:
+            raise ValueError("Index 0 is reserved for transparent")
+        self.colors[index] = tuple(color)
+        self._reindex()
+        self.version += 1
+    
+    def palette_data(self) -> bytes:
+        """Table as RGBA palette data for Image.putpalette(data, 'RGBA')"""
+        if self._palette is None:
+            self._palette = bytes(v for color in self.colors for v in color)
+        return self._palette
+    
+    def _reindex(self):
+        self._indices = {}
+        for index, color in enumerate(self.colors):
+            self._indices.setdefault(color, index)
+        self._palette = None
+    
+    def _nearest(self, color) -> int:
+        if color[3] == 0:
+            return 0
+        return min(range(1, len(self.colors)),
+                   key=lambda i: sum((a - b) ** 2 for a, b in zip(self.colors[i], color)))
+    
+    def to_list(self):
+        """Entries after the transparent one, as [r, g, b, a] lists"""
+        return [list(color) for color in self.colors[1:]]
+    
+    @staticmethod
+    def from_list(data):
+        return ColorTable(data)
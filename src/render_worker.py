@@ -0,0 +1,76 @@
+"""
+Render Worker - Builds view frames on a background thread
+The Tk thread submits frame requests and only presents the finished buffers
+"""
+import threading
+import traceback
+from typing import NamedTuple, Optional, Tuple
+
+
+class FrameRequest(NamedTuple):
+    """Immutable snapshot of everything needed to compose one view frame"""
+    seq: int
+    view_size: Tuple[int, int]
+    canvas_size: Tuple[int, int]
+    zoom: float
+    pan: Tuple[float, float]
+    show_grid: bool
+    preview_object: object
+    stroke: tuple  # (StrokeOverlay, point count) while a brush/pencil stroke is in progress
+    floating: tuple  # (FloatingSelection, offset) while a selection is dragged
+    layers: tuple  # ObjectManager.snapshot_layers()
+
+
+class RenderWorker:
+    """Single background thread with a one-slot request queue and a one-slot result buffer
+
+    A request submitted while another is still waiting replaces it, and a finished
+    frame that has not been presented yet is replaced by any newer one, so stale
+    frames are dropped instead of queuing up behind fresh input.
+    """
+
+    def __init__(self, render_fn):
+        self._render_fn = render_fn  # Called as render_fn(request) -> PIL Image
+        self._cond = threading.Condition()
+        self._pending: Optional[FrameRequest] = None
+        self._finished = None  # (request, image) waiting to be presented
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="RenderWorker", daemon=True)
+        self._thread.start()
+
+    def submit(self, request: FrameRequest):
+        """Queue a frame, dropping any older request that has not started yet"""
+        with self._cond:
+            self._pending = request
+            self._cond.notify()
+
+    def take_frame(self):
+        """Return the newest finished (request, image) pair, or None"""
+        with self._cond:
+            frame, self._finished = self._finished, None
+            return frame
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                request, self._pending = self._pending, None
+
+            try:
+                image = self._render_fn(request)
+            except Exception as e:
+                print(f"Render error: {e}")
+                traceback.print_exc()
+                continue
+
+            with self._cond:
+                if self._finished is None or self._finished[0].seq < request.seq:
+                    self._finished = (request, image)
@@ -0,0 +1,52 @@
+"""
+Selection - Ordered set of selected objects
+O(1) membership tests and removal, iteration in the order objects were selected
+"""
+
+
+class Selection:
+    """Insertion-ordered set of objects backed by a dict
+
+    Keeps the list-style methods the editor already uses (append, remove, copy,
+    clear, len, iteration) so call sites read the same, but membership is O(1).
+    """
+
+    def __init__(self, objects=()):
+        self._items = dict.fromkeys(objects)
+
+    def __contains__(self, obj):
+        return obj in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __repr__(self):
+        return f"Selection({list(self._items)!r})"
+
+    def add(self, obj):
+        self._items[obj] = None
+
+    append = add
+
+    def discard(self, obj):
+        self._items.pop(obj, None)
+
+    def remove(self, obj):
+        del self._items[obj]
+
+    def clear(self):
+        self._items.clear()
+
+    def copy(self):
+        """Snapshot as a list, in selection order"""
+        return list(self._items)
+
+    def first(self):
+        """Earliest selected object, or None"""
+        return next(iter(self._items), None)
@@ -0,0 +1,94 @@
+"""
+Spatial Index - Uniform grid over object bounds for hit-testing and rectangle queries
+Point and rectangle lookups only test objects registered in the grid cells they touch
+"""
+import math
+
+
+CELL_SIZE = 32
+MAX_CELLS = 256  # Objects spanning more cells than this are kept in a separate list
+HIT_MARGIN = 3  # contains_point accepts points slightly outside get_bounds (line/path tolerance)
+
+
+class SpatialIndex:
+    """Uniform grid mapping cells to the objects whose (padded) bounds overlap them"""
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> set of objects
+        self.large = set()  # Objects too big to register cell by cell
+        self._placement = {}  # obj -> tuple of cells, or None if in self.large
+
+    def __len__(self):
+        return len(self._placement)
+
+    def _cells_for(self, bounds):
+        cs = self.cell_size
+        x0, y0, x1, y1 = bounds
+        cx0, cy0 = math.floor((x0 - HIT_MARGIN) / cs), math.floor((y0 - HIT_MARGIN) / cs)
+        cx1, cy1 = math.floor((x1 + HIT_MARGIN) / cs), math.floor((y1 + HIT_MARGIN) / cs)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > MAX_CELLS:
+            return None
+        return tuple((cx, cy) for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1))
+
+    def insert(self, obj):
+        if obj in self._placement:
+            self.remove(obj)
+        cells = self._cells_for(obj.get_bounds())
+        self._placement[obj] = cells
+        if cells is None:
+            self.large.add(obj)
+            return
+        for cell in cells:
+            bucket = self.cells.get(cell)
+            if bucket is None:
+                self.cells[cell] = bucket = set()
+            bucket.add(obj)
+
+    def remove(self, obj):
+        if obj not in self._placement:
+            return
+        cells = self._placement.pop(obj)
+        if cells is None:
+            self.large.discard(obj)
+            return
+        for cell in cells:
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(obj)
+                if not bucket:
+                    del self.cells[cell]
+
+    def update(self, obj):
+        """Re-register an object after its geometry changed"""
+        cells = self._cells_for(obj.get_bounds())
+        if self._placement.get(obj, ()) != cells:
+            self.insert(obj)
+
+    def query_point(self, x, y):
+        """Candidate objects that may contain (x, y)"""
+        cs = self.cell_size
+        found = set(self.cells.get((math.floor(x / cs), math.floor(y / cs)), ()))
+        found.update(self.large)
+        return found
+
+    def query_rect(self, rect):
+        """Candidate objects whose bounds may overlap the inclusive rect (x0, y0, x1, y1)"""
+        cs = self.cell_size
+        x0, y0, x1, y1 = rect
+        found = set(self.large)
+        cells = self.cells
+        cx0, cy0 = math.floor(x0 / cs), math.floor(y0 / cs)
+        cx1, cy1 = math.floor(x1 / cs), math.floor(y1 / cs)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+            # Sparse grid: walking the occupied cells is cheaper
+            for (cx, cy), bucket in cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    found.update(bucket)
+        else:
+            for cy in range(cy0, cy1 + 1):
+                for cx in range(cx0, cx1 + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket:
+                        found.update(bucket)
+        return found
@@ -0,0 +1,45 @@
+"""
+Stroke Overlay - Incremental raster of a brush/pencil stroke that is still being drawn
+Only the segments added since the last frame are painted, so a frame costs the same however long the stroke is
+"""
+from .tile_cache import TileCache
+from .vector_objects import VectorPath
+
+
+class StrokeOverlay:
+    """Sparse tiles holding the painted part of a growing VectorPath
+
+    The path's points only grow while the stroke is in progress. A frame passes
+    the point count it saw, and sync() paints the segments up to that count. Once the
+    stroke is released the path is added to its layer and repainted there in one go.
+    """
+
+    def __init__(self, path: VectorPath):
+        self.path = path
+        self.cache = None
+        self.drawn = 0  # Number of points already painted
+
+    def sync(self, count, width, height):
+        """Paint the points added since the last sync, up to count"""
+        if self.cache is None or self.cache.size != (width, height):
+            self.cache = TileCache(size=(width, height))
+            self.drawn = 0
+
+        path = self.path
+        point = path.point
+        if self.drawn == 0 and count > 0:
+            # Lone starting point, drawn as a dot like VectorPath does
+            self.cache.paint_over(VectorPath([point(0)], path.color, path.thickness))
+            self.drawn = 1
+
+        for i in range(self.drawn, count):
+            if path.thickness > 2 and i > 1:
+                # Round joint at the previous vertex, standing in for joint="curve"
+                self.cache.paint_over(VectorPath([point(i - 1)], path.color, path.thickness))
+            self.cache.paint_over(VectorPath([point(i - 1), point(i)], path.color, path.thickness))
+        self.drawn = max(self.drawn, count)
+
+    def composite_onto(self, target, origin=(0, 0)):
+        """Alpha-composite the painted stroke onto target, whose top-left sits at canvas point origin"""
+        if self.cache is not None:
+            self.cache.composite_onto(target, origin)
@@ -0,0 +1,407 @@
+"""
+Tile Cache - Sparse tiled raster storage for layer caches
+Large canvases are split into fixed-size tiles so an edit only re-renders the tiles it touches
+"""
+import math
+import threading
+from PIL import Image, ImageDraw
+
+
+TILE_SIZE = 256
+
+
+def shift_xy(xy, dx, dy):
+    """Translate a PIL coordinate sequence (pairs or flat values) by (dx, dy)"""
+    if not dx and not dy:
+        return xy
+    if isinstance(xy[0], (tuple, list)):
+        return [(x + dx, y + dy) for x, y in xy]
+    return [v + (dy if i % 2 else dx) for i, v in enumerate(xy)]
+
+
+def segment_near_rect(seg, rect, margin):
+    """Whether segment (x0, y0, x1, y1) passes within margin of an exclusive rect"""
+    x0, y0, x1, y1 = seg
+    left, top, right, bottom = rect[0] - margin, rect[1] - margin, rect[2] + margin, rect[3] + margin
+    if max(x0, x1) < left or min(x0, x1) > right or max(y0, y1) < top or min(y0, y1) > bottom:
+        return False
+    # Separating axis along the segment's normal: all corners on one side means no overlap
+    nx, ny = y1 - y0, x0 - x1
+    sides = [(cx - x0) * nx + (cy - y0) * ny for cx in (left, right) for cy in (top, bottom)]
+    return min(sides) <= 0 <= max(sides)
+
+
+class OffsetDraw:
+    """ImageDraw wrapper that shifts canvas coordinates into a tile's local space"""
+
+    def __init__(self, image, ox=0, oy=0):
+        self.image = image
+        self.draw = ImageDraw.Draw(image)
+        self.ox = ox
+        self.oy = oy
+
+    def _shift(self, xy):
+        return shift_xy(xy, -self.ox, -self.oy)
+
+    def point(self, xy, **kwargs):
+        self.draw.point(self._shift(xy), **kwargs)
+
+    def line(self, xy, **kwargs):
+        width = kwargs.get('width', 0)
+        if width > 1:
+            self._wide_line(xy, **kwargs)
+        else:
+            self.draw.line(self._shift(xy), **kwargs)
+
+    def _wide_line(self, xy, fill=None, width=0, joint=None):
+        """Draw a wide line exactly as PIL draws it on the whole canvas
+
+        PIL adds each edge's x to the scanline intersections in float32, so moving a
+        wide line sideways can change how its edges round. Wide lines are therefore
+        drawn with canvas x coordinates, into a mask as wide as the canvas up to this
+        tile (or into the tile itself in the leftmost column). Moving them up or down is
+        exact, so the mask only has the tile's rows. End points are truncated in canvas
+        space and joints are placed from canvas coordinates, as PIL would.
+        """
+        if isinstance(xy[0], (tuple, list)):
+            xy = [v for p in xy for v in p]
+        points = list(zip(xy[0::2], xy[1::2]))
+        ends = [v - self.oy if i % 2 else v for i, v in enumerate(int(v) for v in xy)]
+        w, h = self.image.size
+        rect = (self.ox, 0, self.ox + w, h)
+        if len(ends) >= 4 and not any(segment_near_rect(ends[i:i + 4], rect, width)
+                                      for i in range(0, len(ends) - 2, 2)):
+            return
+        
+        if self.ox:
+            mask = Image.new('L', (self.ox + w, h), 0)
+            draw, ink = ImageDraw.Draw(mask), 255
+        else:
+            mask, draw, ink = None, self.draw, fill
+        draw.line(ends, fill=ink, width=width)
+        if joint == "curve" and width > 4:
+            for i in range(1, len(points) - 1):
+                x, y = points[i]
+                if rect[0] - width <= x <= rect[2] + width and self.oy - width <= y <= self.oy + h + width:
+                    self._curve_joint(draw, ink, points[i - 1:i + 2], width)
+        if mask is not None:
+            mask = mask.crop((self.ox, 0, self.ox + w, h))
+            box = mask.getbbox()
+            if box:
+                self.image.paste(fill, box, mask.crop(box))
+    
+    def _curve_joint(self, draw, ink, points, width):
+        """Round joint at points[1], following ImageDraw.line(joint="curve"), placed in the mask's space"""
+        point = points[1]
+        angles = [
+            math.degrees(math.atan2(end[0] - start[0], start[1] - end[1])) % 360
+            for start, end in ((points[0], point), (point, points[2]))
+        ]
+        if angles[0] == angles[1]:
+            # A straight line needs no joint
+            return
+        
+        def coord_at_angle(coord, angle):
+            x, y = coord
+            angle -= 90
+            distance = width / 2 - 1
+            return tuple(
+                p + (math.floor(p_d) if p_d > 0 else math.ceil(p_d))
+                for p, p_d in ((x, distance * math.cos(math.radians(angle))),
+                               (y, distance * math.sin(math.radians(angle))))
+            )
+        
+        def place(coords):
+            # PIL truncates to int in canvas space, then the mask's rows start at oy
+            return [int(v) - self.oy if i % 2 else int(v) for i, v in enumerate(v for c in coords for v in c)]
+        
+        flipped = ((angles[1] > angles[0] and angles[1] - 180 > angles[0])
+                   or (angles[1] < angles[0] and angles[1] + 180 > angles[0]))
+        coords = [(point[0] - width / 2 + 1, point[1] - width / 2 + 1),
+                  (point[0] + width / 2 - 1, point[1] + width / 2 - 1)]
+        if flipped:
+            start, end = (angles[1] + 90, angles[0] + 90)
+        else:
+            start, end = (angles[0] - 90, angles[1] - 90)
+        draw.pieslice(place(coords), start - 90, end - 90, fill=ink)
+        
+        if width > 8:
+            # Cover potential gaps between the line and the joint
+            side = 90 if flipped else -90
+            gap = [coord_at_angle(point, angles[0] + side), point, coord_at_angle(point, angles[1] + side)]
+            draw.line(place(gap), fill=ink, width=3)
+
+    def rectangle(self, xy, **kwargs):
+        self.draw.rectangle(self._shift(xy), **kwargs)
+
+    def ellipse(self, xy, **kwargs):
+        self.draw.ellipse(self._shift(xy), **kwargs)
+
+    def paste(self, xy, source, mask):
+        """Paste an image (or a solid value) through mask with its top-left at canvas point xy"""
+        x, y = self._shift(xy)
+        self.image.paste(source, (int(x), int(y)), mask)
+
+
+class IdDraw:
+    """Drawing proxy that paints every shape with the current object ID instead of its colour
+
+    Wraps an OffsetDraw on an 'I' image, so the same draw_to_image calls that paint
+    a layer also produce its ID map.
+    """
+
+    def __init__(self, draw):
+        self.draw = draw
+        self.ink = 0  # ID of the object being drawn
+
+    def _ink(self, kwargs):
+        for name in ('fill', 'outline'):
+            if kwargs.get(name) is not None:
+                kwargs[name] = self.ink
+        return kwargs
+
+    def point(self, xy, **kwargs):
+        self.draw.point(xy, **self._ink(kwargs))
+
+    def line(self, xy, **kwargs):
+        self.draw.line(xy, **self._ink(kwargs))
+
+    def rectangle(self, xy, **kwargs):
+        self.draw.rectangle(xy, **self._ink(kwargs))
+
+    def ellipse(self, xy, **kwargs):
+        self.draw.ellipse(xy, **self._ink(kwargs))
+
+    def paste(self, xy, source, mask):
+        self.draw.paste(xy, self.ink, mask)
+
+
+class ShiftedDraw:
+    """Drawing proxy that moves every shape by (dx, dy), used to apply a group's pending translation"""
+
+    def __init__(self, draw, dx, dy):
+        self.draw = draw
+        self.dx = dx
+        self.dy = dy
+
+    def point(self, xy, **kwargs):
+        self.draw.point(shift_xy(xy, self.dx, self.dy), **kwargs)
+
+    def line(self, xy, **kwargs):
+        self.draw.line(shift_xy(xy, self.dx, self.dy), **kwargs)
+
+    def rectangle(self, xy, **kwargs):
+        self.draw.rectangle(shift_xy(xy, self.dx, self.dy), **kwargs)
+
+    def ellipse(self, xy, **kwargs):
+        self.draw.ellipse(shift_xy(xy, self.dx, self.dy), **kwargs)
+
+    def paste(self, xy, source, mask):
+        self.draw.paste(shift_xy(xy, self.dx, self.dy), source, mask)
+
+
+def pixel_rect(bounds):
+    """Convert inclusive object bounds into an exclusive integer pixel rect, padded for anti-aliasing"""
+    x0, y0, x1, y1 = bounds
+    return (math.floor(x0) - 1, math.floor(y0) - 1, math.ceil(x1) + 2, math.ceil(y1) + 2)
+
+
+def rects_intersect(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class TileCache:
+    """Sparse grid of tiles (RGBA, or 'I' for ID maps) with per-tile damage rectangles
+
+    Indexed documents use 'P' tiles of ColorTable indices, expanded to RGBA through
+    the table only when they are composited.
+
+    Damage is recorded from the UI thread while tiles are repainted by the render
+    thread, so recording and taking damage are guarded by a lock.
+    """
+
+    def __init__(self, tile_size=TILE_SIZE, size=None, mode='RGBA', color_table=None):
+        self.tile_size = tile_size
+        self.mode = mode
+        self.color_table = color_table  # ColorTable for 'P' tiles
+        self._palette_version = None  # ColorTable.version the tiles' palettes were last refreshed for
+        self.tiles = {}  # (tx, ty) -> Image, only for tiles that hold painted pixels
+        self.damage = {}  # (tx, ty) -> exclusive canvas rect waiting for a repaint
+        self.all_dirty = True
+        self.size = size  # Canvas size the tiles were built for
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Copies (undo history) start empty and re-render on demand
+        return {'tile_size': self.tile_size, 'mode': self.mode, 'color_table': self.color_table}
+
+    def __setstate__(self, state):
+        self.__init__(state['tile_size'], mode=state.get('mode', 'RGBA'), color_table=state.get('color_table'))
+
+    def invalidate(self, bounds=None):
+        """Record object bounds (min_x, min_y, max_x, max_y) as damaged, or the whole cache if None"""
+        with self._lock:
+            self._invalidate(bounds)
+
+    def invalidate_rect(self, rect):
+        """Record an exclusive pixel rect as damaged, without the anti-aliasing padding of object bounds"""
+        with self._lock:
+            self._damage_rect(rect)
+
+    def _invalidate(self, bounds):
+        if bounds is None:
+            self.all_dirty = True
+            self.damage.clear()
+        else:
+            self._damage_rect(pixel_rect(bounds))
+
+    def _damage_rect(self, rect):
+        if not self.all_dirty:
+            for key in self.keys_in_rect(rect):
+                tile = self.tile_rect(key)
+                clipped = (max(rect[0], tile[0]), max(rect[1], tile[1]),
+                           min(rect[2], tile[2]), min(rect[3], tile[3]))
+                if clipped[0] >= clipped[2] or clipped[1] >= clipped[3]:
+                    continue
+                old = self.damage.get(key)
+                if old:
+                    clipped = (min(old[0], clipped[0]), min(old[1], clipped[1]),
+                               max(old[2], clipped[2]), max(old[3], clipped[3]))
+                self.damage[key] = clipped
+
+    def keys_in_rect(self, rect):
+        """Tile keys overlapping an exclusive pixel rect"""
+        ts = self.tile_size
+        x0, y0, x1, y1 = rect
+        tx0, ty0 = x0 // ts, y0 // ts
+        tx1, ty1 = (x1 - 1) // ts, (y1 - 1) // ts
+        if self.size:
+            cols, rows = self.grid_size()
+            tx0, ty0 = max(0, tx0), max(0, ty0)
+            tx1, ty1 = min(cols - 1, tx1), min(rows - 1, ty1)
+        return [(tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)]
+
+    def grid_size(self):
+        ts = self.tile_size
+        width, height = self.size
+        return (width + ts - 1) // ts, (height + ts - 1) // ts
+
+    def tile_rect(self, key):
+        """Canvas rectangle (x0, y0, x1, y1) covered by a tile, exclusive and clipped to the canvas"""
+        ts = self.tile_size
+        tx, ty = key
+        x0, y0 = tx * ts, ty * ts
+        if not self.size:
+            return (x0, y0, x0 + ts, y0 + ts)
+        width, height = self.size
+        return (x0, y0, min(x0 + ts, width), min(y0 + ts, height))
+
+    def take_damage(self, width, height):
+        """Return {tile key: damaged rect} to repaint for this canvas size and reset the damage state"""
+        with self._lock:
+            if self.size != (width, height):
+                # Drop all tiles when the canvas size changes
+                self.size = (width, height)
+                self.tiles.clear()
+                self._invalidate(None)
+            return self._take_damage()
+
+    def _take_damage(self):
+        cols, rows = self.grid_size()
+        if self.all_dirty:
+            self.tiles.clear()
+            damage = {}
+            for ty in range(rows):
+                for tx in range(cols):
+                    damage[(tx, ty)] = self.tile_rect((tx, ty))
+        else:
+            damage = {key: rect for key, rect in self.damage.items()
+                      if 0 <= key[0] < cols and 0 <= key[1] < rows}
+        self.all_dirty = False
+        self.damage = {}
+        return damage
+
+    def repaint(self, key, rect, objects, ids=None, underlay=None):
+        """
+        Clear rect inside a tile and redraw the given objects (already in z-order) into it.
+        With ids (object -> int), each object is painted with its ID instead of its colour.
+        underlay(image, rect), if given, paints the cleared patch before the objects.
+        """
+        tile = self.tiles.get(key)
+        full = self.tile_rect(key)
+        if not objects and underlay is None and (tile is None or rect == full):
+            self.tiles.pop(key, None)
+            return
+        # The patch starts at the tile's origin, so objects are shifted exactly as in a full
+        # repaint of the tile: PIL's rounding depends on the shift
+        patch_rect = (full[0], full[1], rect[2], rect[3])
+        patch = Image.new(self.mode, (rect[2] - full[0], rect[3] - full[1]), 0)
+        if underlay is not None:
+            underlay(patch, patch_rect)
+        draw = OffsetDraw(patch, full[0], full[1])
+        if ids is None:
+            for obj in objects:
+                obj.draw_to_image(draw)
+        else:
+            draw = IdDraw(draw)
+            for obj in objects:
+                draw.ink = ids(obj)
+                obj.draw_to_image(draw)
+        if rect == full:
+            tile = patch
+        else:
+            if tile is None:
+                tile = Image.new(self.mode, (full[2] - full[0], full[3] - full[1]), 0)
+            box = (rect[0] - full[0], rect[1] - full[1])
+            tile.paste(patch.crop(box + patch.size), box)
+        self.store(key, tile)
+
+    def paint_over(self, obj):
+        """Draw an object on top of the existing tile pixels it touches, without clearing them first"""
+        for key in self.keys_in_rect(pixel_rect(obj.get_bounds())):
+            full = self.tile_rect(key)
+            tile = self.tiles.get(key)
+            if tile is None:
+                tile = Image.new(self.mode, (full[2] - full[0], full[3] - full[1]), 0)
+            obj.draw_to_image(OffsetDraw(tile, full[0], full[1]))
+            self.store(key, tile)
+
+    def store(self, key, image):
+        """Keep a freshly painted tile, or free it if nothing was painted"""
+        if image is None or image.getbbox() is None:
+            self.tiles.pop(key, None)
+        else:
+            if self.color_table is not None:
+                image.putpalette(self.color_table.palette_data(), 'RGBA')
+            self.tiles[key] = image
+
+    def pixel(self, x, y):
+        """Value of canvas pixel (x, y) (RGBA for indexed tiles), or None where no tile is allocated"""
+        ts = self.tile_size
+        tile = self.tiles.get((x // ts, y // ts))
+        if tile is None:
+            return None
+        value = tile.getpixel((x % ts, y % ts))
+        if self.color_table is not None:
+            return self.color_table[value]
+        return value
+
+    def composite_onto(self, target, origin=(0, 0)):
+        """Alpha-composite allocated tiles onto target, whose top-left sits at canvas point origin"""
+        ts = self.tile_size
+        ox, oy = origin
+        tw, th = target.size
+        table = self.color_table
+        if table is not None and self._palette_version != table.version:
+            # An entry was edited: refresh the palettes once, instead of on every composite
+            palette = table.palette_data()
+            for tile in self.tiles.values():
+                tile.putpalette(palette, 'RGBA')
+            self._palette_version = table.version
+        for (tx, ty), tile in self.tiles.items():
+            x, y = tx * ts - ox, ty * ts - oy
+            if x >= tw or y >= th or x + tile.width <= 0 or y + tile.height <= 0:
+                continue
+            if table is not None:
+                tile = tile.convert('RGBA')
+            target.alpha_composite(tile, dest=(max(0, x), max(0, y)), source=(max(0, -x), max(0, -y)))
@@ -24,6 +24,7 @@ class Toolbar(tk.Frame):
             ("Line", "📏", "L"),
             ("Rectangle", "▢", "R"),
             ("Circle", "○", "C"),
+            ("Tile", "▦", "T"),
         ]
         
         self.buttons = {}
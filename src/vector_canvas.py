@@ -3,16 +3,27 @@ Vector Canvas - Canvas that manages vector objects and rasterizes them for displ
 """
 import tkinter as tk
 from tkinter import Canvas
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageTk, ImageDraw, ImageChops
 import copy
+import math
+import time
 
 from .object_manager import ObjectManager
+from .render_worker import FrameRequest, RenderWorker
+from .stroke_overlay import StrokeOverlay
+from .tile_cache import OffsetDraw
+from .vector_objects import VectorPath, VectorLine, VectorRectangle, VectorCircle
+
+
+FRAME_POLL_MS = 8  # How often the Tk thread checks for a finished frame
+DEFAULT_FRAME_RATE = 60  # Upper bound on scheduled renders per second
 
 
 class VectorCanvas:
     """Vector-based canvas with pixel rendering"""
     
-    def __init__(self, parent, width=32, height=32, on_change=None):
+    def __init__(self, parent, width=32, height=32, on_change=None, frame_rate=DEFAULT_FRAME_RATE,
+                 simplify_tolerance=0.0):
         self.parent = parent
         self.width = width
         self.height = height
@@ -20,6 +31,7 @@ class VectorCanvas:
         
         # Vector object manager
         self.object_manager = ObjectManager()
+        self.object_manager.canvas_size = (width, height)
         
         # View state
         self.zoom_level = 10.0
@@ -42,20 +54,43 @@ class VectorCanvas:
         self.h_scrollbar = tk.Scrollbar(self.canvas_container, orient=tk.HORIZONTAL, command=self._on_hscroll)
         self.h_scrollbar.grid(row=1, column=0, sticky="ew")
         
-        # Rendering cache
+        # Rendering cache: one PhotoImage per widget size, shown by a single canvas item
         self.photo_image = None
+        self._image_item = None
         self.need_render = True
         
+        # Frame pacing: render requests are coalesced into at most one frame per interval
+        self.set_frame_rate(frame_rate)
+        self._render_queued = None  # Pending after/after_idle id
+        self._last_frame_time = 0.0
+        
+        # Background frame composition; the Tk thread only presents finished frames
+        self.render_worker = RenderWorker(self._compose_frame)
+        self._frame_seq = 0
+        self._presented_seq = 0
+        self._poll_id = None
+        
+        # Static view decorations reused across frames (render thread only)
+        self._checker_cache = None  # ((c_size, view size), image)
+        self._grid_lines = None  # ((zoom, canvas size), column mask, row mask)
+        self._grid_cache = None  # ((zoom, canvas size, view size, offset), (position, mask))
+        
         # Mouse state
         self.is_panning = False
         self.pan_start = None
         
         # Preview object from current tool
         self.preview_object = None
+        self._stroke_overlay = None  # Incremental raster of a VectorPath preview
+        
+        # Tk canvas items drawn over the frame: selection outlines and shape/marquee previews
+        self._selection_items = []
+        self._preview_item = None  # (kind, item id)
         
         # Current tool
         self.current_tool = None
         self.current_tool_name = "Pencil"
+        self.simplify_tolerance = simplify_tolerance  # Stroke simplification on release, in pixels (0 = off)
         
         # Bind events
         self._bind_events()
@@ -78,6 +113,17 @@ class VectorCanvas:
         # Panning (Middle click or Space+Left click handled via set_pan_mode)
         self.canvas.bind("<Button-2>", lambda e: self.set_pan_mode(True, e))
         self.canvas.bind("<ButtonRelease-2>", lambda e: self.set_pan_mode(False, e))
+        
+        self.canvas.bind("<Destroy>", self._on_destroy)
+
+    def _on_destroy(self, event):
+        """Stop the render thread and pending frame callbacks when the canvas goes away"""
+        self.render_worker.stop()
+        for after_id in (self._render_queued, self._poll_id):
+            if after_id is not None:
+                self.canvas.after_cancel(after_id)
+        self._render_queued = None
+        self._poll_id = None
 
     def _on_press(self, event):
         """Handle mouse press"""
@@ -93,9 +139,10 @@ class VectorCanvas:
             return
 
         if self.current_tool:
+            before = self.object_manager.snapshot_layers()
             self.current_tool.on_press(px, py, self.object_manager)
             self.preview_object = self.current_tool.get_preview_object()
-            self.force_render()
+            self._refresh_after_tool(before)
 
     def _on_drag(self, event):
         """Handle mouse drag"""
@@ -108,9 +155,10 @@ class VectorCanvas:
             
         px, py = self.screen_to_canvas(event.x, event.y)
         if self.current_tool:
+            before = self.object_manager.snapshot_layers()
             self.current_tool.on_drag(px, py, self.object_manager)
             self.preview_object = self.current_tool.get_preview_object()
-            self.force_render()
+            self._refresh_after_tool(before)
 
     def _on_release(self, event):
         """Handle mouse release"""
@@ -119,19 +167,34 @@ class VectorCanvas:
             
         px, py = self.screen_to_canvas(event.x, event.y)
         if self.current_tool:
+            before = self.object_manager.snapshot_layers()
             self.current_tool.on_release(px, py, self.object_manager)
             self.preview_object = None
-            self.force_render()
+            self._refresh_after_tool(before)
             
             if self.on_change:
                 self.on_change()
     
+    def _refresh_after_tool(self, layers_before):
+        """
+        Redraw what a tool event changed. Shape and marquee previews and selection outlines
+        live on the Tk overlay, so a raster frame is only needed when the tool changed
+        layer content or is growing a stroke.
+        """
+        if (isinstance(self.preview_object, VectorPath)
+                or self.object_manager.floating is not None
+                or self.object_manager.snapshot_layers() != layers_before):
+            # The overlay follows when the new frame is presented
+            self.force_render()
+        else:
+            self.update_overlay()
+    
     def set_tool(self, tool_name):
         """Set active tool"""
         from .vector_tools import (
             VectorPencilTool, VectorBrushTool, VectorEraserTool,
             VectorLineTool, VectorRectangleTool, VectorCircleTool,
-            VectorEyedropperTool, VectorSelectTool, VectorFillTool
+            VectorEyedropperTool, VectorSelectTool, VectorFillTool, VectorTileTool
         )
         
         self.current_tool_name = tool_name
@@ -157,30 +220,46 @@ class VectorCanvas:
         elif tool_name == "Eyedropper":
             # Callback will be set by the caller (app)
             self.current_tool = VectorEyedropperTool()
+        elif tool_name == "Tile":
+            self.current_tool = VectorTileTool()
         # Other tools as needed
         
+        if hasattr(self.current_tool, 'simplify_tolerance'):
+            self.current_tool.simplify_tolerance = self.simplify_tolerance
         self.canvas.config(cursor=self.current_tool.get_cursor() if self.current_tool else "crosshair")
 
+    def set_simplify_tolerance(self, tolerance):
+        """Set how far (in pixels) pencil/brush strokes may be simplified when released; 0 keeps every point"""
+        self.simplify_tolerance = max(0.0, tolerance)
+        if hasattr(self.current_tool, 'simplify_tolerance'):
+            self.current_tool.simplify_tolerance = self.simplify_tolerance
+    
+    def set_frame_rate(self, frame_rate):
+        """Set the maximum number of scheduled renders per second"""
+        self.frame_interval = 1.0 / max(1, frame_rate)
+    
     def force_render(self):
-        """Request a render as soon as the UI is idle"""
+        """Request a frame; requests are coalesced until the next frame slot and then render the newest state"""
         self.need_render = True
-        if not hasattr(self, '_render_queued'):
-            self._render_queued = False
+        if self._render_queued is not None:
+            return
         
-        if not self._render_queued:
-            self._render_queued = True
-            # Use after_idle to debounce multiple render requests during a single event loop
-            self.canvas.after_idle(self._execute_render)
+        wait = self._last_frame_time + self.frame_interval - time.perf_counter()
+        if wait > 0:
+            self._render_queued = self.canvas.after(max(1, int(wait * 1000)), self._execute_render)
+        else:
+            # Let the events already queued in this loop iteration update the state first
+            self._render_queued = self.canvas.after_idle(self._execute_render)
     
     def _execute_render(self):
         """Internal method to execute the queued render"""
-        self._render_queued = False
+        self._render_queued = None
+        self._last_frame_time = time.perf_counter()
         self.render()
     
     def _on_resize(self, event):
         """Handle canvas resize"""
-        self.need_render = True
-        self.render()
+        self.force_render()
     
     def _on_mousewheel(self, event):
         """Handle zoom with mouse wheel"""
@@ -206,8 +285,7 @@ class VectorCanvas:
             self.pan_offset[0] = x - canvas_w/2 - px * self.zoom_level
             self.pan_offset[1] = y - canvas_h/2 - py * self.zoom_level
             
-            self.need_render = True
-            self.render()
+            self.force_render()
     
     def set_pan_mode(self, enabled, event=None):
         """Enable/disable pan mode"""
@@ -225,8 +303,7 @@ class VectorCanvas:
         """Pan the canvas"""
         self.pan_offset[0] += dx
         self.pan_offset[1] += dy
-        self.need_render = True
-        self.render()
+        self.force_render()
     
     def _on_vscroll(self, *args):
         """Handle vertical scrollbar"""
@@ -274,9 +351,8 @@ class VectorCanvas:
     
     def get_pixel(self, x, y):
         """Get rendered pixel color at (x, y)"""
-        img = self.object_manager.rasterize(self.width, self.height)
         if 0 <= x < self.width and 0 <= y < self.height:
-            return img.getpixel((x, y))
+            return self.object_manager.pixel_at(x, y, self.width, self.height)
         return None
     
     def add_object(self, obj):
@@ -290,30 +366,30 @@ class VectorCanvas:
         """Set preview object for rendering"""
         self.preview_object = obj
         self.need_render = True
+        self.update_overlay()
     
     def clear_preview(self):
         """Clear preview object"""
         self.preview_object = None
         self.need_render = True
+        self.update_overlay()
     
     def clear(self, bg_color=(255, 255, 255, 255)):
         """Clear all objects"""
         self.object_manager.clear()
-        self.need_render = True
-        self.render()
+        self.force_render()
     
     def resize_canvas(self, new_width, new_height):
         """Resize canvas"""
         self.width = new_width
         self.height = new_height
-        self.need_render = True
-        self.render()
+        self.object_manager.canvas_size = (new_width, new_height)
+        self.force_render()
     
     def toggle_grid(self):
         """Toggle grid visibility"""
         self.show_grid = not self.show_grid
-        self.need_render = True
-        self.render()
+        self.force_render()
     
     def copy_state(self):
         """Deep copy current state for history"""
@@ -322,100 +398,286 @@ class VectorCanvas:
     def restore_state(self, state):
         """Restore state from history"""
         self.object_manager.layers = state
-        self.need_render = True
-        self.render()
+        self.force_render()
 
     def render(self):
-        """Render vector objects to pixel canvas using Image scaling for performance"""
+        """Snapshot the view state and hand the frame to the render thread"""
         if not self.need_render:
             return
         
-        try:
-            canvas_w = self.canvas.winfo_width()
-            canvas_h = self.canvas.winfo_height()
-            
-            if canvas_w < 10 or canvas_h < 10:
-                return
-            
-            # 1. Get Project Raster (1:1)
-            project_img = self.object_manager.rasterize(self.width, self.height)
-            
-            # 2. Add preview object if exists
-            if self.preview_object:
-                draw_p = ImageDraw.Draw(project_img)
-                self.preview_object.draw_to_image(draw_p)
+        canvas_w = self.canvas.winfo_width()
+        canvas_h = self.canvas.winfo_height()
+        if canvas_w < 10 or canvas_h < 10:
+            return
+        
+        preview, stroke = self.preview_object, None
+        floating = self.object_manager.floating
+        if isinstance(preview, VectorPath):
+            # Growing brush/pencil stroke: the worker only paints its new segments
+            if self._stroke_overlay is None or self._stroke_overlay.path is not preview:
+                self._stroke_overlay = StrokeOverlay(preview)
+            stroke = (self._stroke_overlay, preview.point_count())
+            preview = None
+        else:
+            self._stroke_overlay = None
+            if self._is_overlay_preview(preview):
+                # Drawn as a Tk canvas item by update_overlay
+                preview = None
+            elif preview:
+                # The tool keeps editing its preview object, so the worker gets its own copy
+                preview = copy.deepcopy(preview)
+        
+        self._frame_seq += 1
+        self.render_worker.submit(FrameRequest(
+            seq=self._frame_seq,
+            view_size=(canvas_w, canvas_h),
+            canvas_size=(self.width, self.height),
+            zoom=self.zoom_level,
+            pan=tuple(self.pan_offset),
+            show_grid=self.show_grid,
+            preview_object=preview,
+            stroke=stroke,
+            floating=(floating, floating.offset) if floating else None,
+            layers=self.object_manager.snapshot_layers(),
+        ))
+        self.need_render = False
+        
+        if self._poll_id is None:
+            self._poll_id = self.canvas.after(FRAME_POLL_MS, self._poll_frame)
+    
+    def _poll_frame(self):
+        """Present the newest finished frame and keep polling while frames are outstanding"""
+        self._poll_id = None
+        frame = self.render_worker.take_frame()
+        if frame is not None:
+            request, view_img = frame
+            if request.seq > self._presented_seq:
+                self._present(request, view_img)
+        
+        if self._presented_seq < self._frame_seq:
+            self._poll_id = self.canvas.after(FRAME_POLL_MS, self._poll_frame)
+    
+    def _present(self, request, view_img):
+        """Show a finished frame (Tk thread only)"""
+        self._presented_seq = request.seq
+        
+        # Reuse the PhotoImage unless the widget was resized, and update it in place
+        if self.photo_image is None or (self.photo_image.width(), self.photo_image.height()) != view_img.size:
+            self.photo_image = ImageTk.PhotoImage('RGB', view_img.size)
+            if self._image_item is None:
+                self._image_item = self.canvas.create_image(0, 0, image=self.photo_image, anchor=tk.NW)
+                self.canvas.tag_lower(self._image_item)
+            else:
+                self.canvas.itemconfigure(self._image_item, image=self.photo_image)
+        self.photo_image.paste(view_img)
+        self.update_overlay(request.zoom, request.pan, request.view_size)
+        
+        # Update Scrollbars
+        canvas_w, canvas_h = request.view_size
+        sw = int(request.canvas_size[0] * request.zoom)
+        sh = int(request.canvas_size[1] * request.zoom)
+        max_view_w = max(canvas_w, sw + 400)
+        max_view_h = max(canvas_h, sh + 400)
+        vx = 0.5 - (request.pan[0] / max_view_w)
+        vy = 0.5 - (request.pan[1] / max_view_h)
+        self.h_scrollbar.set(max(0, vx-0.1), min(1, vx+0.1))
+        self.v_scrollbar.set(max(0, vy-0.1), min(1, vy+0.1))
+    
+    def _view_offset(self, zoom, pan, view_size):
+        """Screen position of canvas pixel (0, 0) for a view, matching the frame composition"""
+        canvas_w, canvas_h = view_size
+        sw = int(self.width * zoom)
+        sh = int(self.height * zoom)
+        return int(canvas_w/2 + pan[0] - sw/2), int(canvas_h/2 + pan[1] - sh/2)
+    
+    @staticmethod
+    def _is_overlay_preview(obj):
+        return type(obj) in (VectorLine, VectorRectangle, VectorCircle)
+    
+    def update_overlay(self, zoom=None, pan=None, view_size=None):
+        """
+        Move the Tk overlay items (selection outlines, shape/marquee preview) to the
+        current state, using the given view or the live one. No raster work is done.
+        """
+        if zoom is None:
+            zoom, pan = self.zoom_level, self.pan_offset
+            view_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        off_x, off_y = self._view_offset(zoom, pan, view_size)
+        
+        # Selection outlines: reuse items, creating or deleting only to match the count
+        floating = self.object_manager.floating
+        bounds = [floating.shifted_bounds(obj) if floating else obj.get_bounds()
+                  for obj in self.object_manager.selected_objects if hasattr(obj, 'get_bounds')]
+        items = self._selection_items
+        while len(items) < len(bounds):
+            items.append(self.canvas.create_rectangle(0, 0, 0, 0, outline='#00ffff', width=2, tags="overlay"))
+        while len(items) > len(bounds):
+            self.canvas.delete(items.pop())
+        for item, (bx0, by0, bx1, by1) in zip(items, bounds):
+            self.canvas.coords(item,
+                               off_x + int((bx0 - 0.5) * zoom), off_y + int((by0 - 0.5) * zoom),
+                               off_x + int((bx1 + 0.5) * zoom), off_y + int((by1 + 0.5) * zoom))
+        
+        self._update_preview_item(self.preview_object, zoom, off_x, off_y)
+    
+    def _update_preview_item(self, obj, zoom, off_x, off_y):
+        """Show a line/rectangle/circle preview as a Tk item covering the pixel cells it will fill"""
+        if not self._is_overlay_preview(obj):
+            if self._preview_item:
+                self.canvas.delete(self._preview_item[1])
+                self._preview_item = None
+            return
+        
+        color = '#%02x%02x%02x' % tuple(obj.color[:3])
+        half = zoom / 2
+        if isinstance(obj, VectorLine):
+            kind = 'line'
+            coords = (off_x + obj.x0 * zoom + half, off_y + obj.y0 * zoom + half,
+                      off_x + obj.x1 * zoom + half, off_y + obj.y1 * zoom + half)
+            options = {'fill': color, 'width': max(1, zoom * obj.thickness), 'capstyle': tk.PROJECTING}
+        else:
+            if isinstance(obj, VectorRectangle):
+                kind = 'rectangle'
+                x0, y0, x1, y1 = obj.x0, obj.y0, obj.x1, obj.y1
+            else:
+                kind = 'oval'
+                x0, y0 = obj.cx - obj.radius, obj.cy - obj.radius
+                x1, y1 = obj.cx + obj.radius, obj.cy + obj.radius
+            # Outline runs through the middle of the edge cells
+            coords = (off_x + x0 * zoom + half, off_y + y0 * zoom + half,
+                      off_x + x1 * zoom + half, off_y + y1 * zoom + half)
+            options = {'outline': color, 'width': max(1, zoom), 'fill': color if obj.filled else ''}
+        
+        if self._preview_item and self._preview_item[0] == kind:
+            item = self._preview_item[1]
+            self.canvas.coords(item, *coords)
+            self.canvas.itemconfigure(item, **options)
+        else:
+            if self._preview_item:
+                self.canvas.delete(self._preview_item[1])
+            create = {'line': self.canvas.create_line, 'rectangle': self.canvas.create_rectangle,
+                      'oval': self.canvas.create_oval}[kind]
+            self._preview_item = (kind, create(*coords, tags="overlay", **options))
+    
+    def _compose_frame(self, request):
+        """Rasterize the snapshot and compose the screen-sized view image (render thread)"""
+        canvas_w, canvas_h = request.view_size
+        width, height = request.canvas_size
+        
+        # 1. View properties
+        pixel_size = request.zoom
+        sw = int(width * pixel_size)
+        sh = int(height * pixel_size)
+        off_x = int(canvas_w/2 + request.pan[0] - sw/2)
+        off_y = int(canvas_h/2 + request.pan[1] - sh/2)
+        
+        # 2. Visible source rectangle (canvas pixels that land inside the widget)
+        src_x0 = max(0, math.floor(-off_x / pixel_size))
+        src_y0 = max(0, math.floor(-off_y / pixel_size))
+        src_x1 = min(width, math.ceil((canvas_w - off_x) / pixel_size))
+        src_y1 = min(height, math.ceil((canvas_h - off_y) / pixel_size))
+        
+        # 3. Create view buffer (Screen size)
+        view_img = Image.new('RGB', (canvas_w, canvas_h), color='#1e1e1e')
+        
+        if src_x0 < src_x1 and src_y0 < src_y1:
+            # Screen rectangle covered by the visible source pixels
+            dst_x0 = off_x + int(src_x0 * pixel_size)
+            dst_y0 = off_y + int(src_y0 * pixel_size)
+            dst_x1 = off_x + int(src_x1 * pixel_size)
+            dst_y1 = off_y + int(src_y1 * pixel_size)
             
-            # 3. Create view buffer (Screen size)
-            view_img = Image.new('RGB', (canvas_w, canvas_h), color='#1e1e1e')
-            draw = ImageDraw.Draw(view_img)
+            # 4. Get Project Raster (1:1), cropped to the visible rectangle
+            project_img = self.object_manager.rasterize(
+                width, height, (src_x0, src_y0, src_x1, src_y1), request.layers, request.floating)
             
-            # 4. View properties
-            pixel_size = self.zoom_level
-            sw = int(self.width * pixel_size)
-            sh = int(self.height * pixel_size)
-            off_x = int(canvas_w/2 + self.pan_offset[0] - sw/2)
-            off_y = int(canvas_h/2 + self.pan_offset[1] - sh/2)
+            # 5. Add preview object if exists
+            if request.preview_object:
+                request.preview_object.draw_to_image(OffsetDraw(project_img, src_x0, src_y0))
+            if request.stroke:
+                overlay, count = request.stroke
+                overlay.sync(count, width, height)
+                overlay.composite_onto(project_img, (src_x0, src_y0))
             
-            # 5. Draw Checkerboard background efficiently
+            # 6. Draw Checkerboard background under the visible part only
             c_size = max(4, int(pixel_size / 2))
-            if sw > 0 and sh > 0:
-                # Create a 2x2 pattern and tile it
-                pattern = Image.new('RGB', (c_size*2, c_size*2), (200, 200, 200))
-                p_draw = ImageDraw.Draw(pattern)
-                p_draw.rectangle([0, 0, c_size-1, c_size-1], fill=(220, 220, 220))
-                p_draw.rectangle([c_size, c_size, c_size*2-1, c_size*2-1], fill=(220, 220, 220))
-                
-                # Create a tiled background by tiling the pattern
-                # PIL doesn't have a direct tile method, so we manually paste in a loop
-                # but with much larger chunks (c_size*2)
-                for y in range(0, sh, c_size*2):
-                    for x in range(0, sw, c_size*2):
-                        view_img.paste(pattern, (off_x + x, off_y + y))
-
-            # 6. Scale and Paste Project Image
-            if sw > 0 and sh > 0:
-                scaled_project = project_img.resize((sw, sh), Image.NEAREST)
-                view_img.paste(scaled_project, (off_x, off_y), scaled_project)
-            
-            # 7. Draw Grid
-            if self.show_grid and self.zoom_level >= 4:
-                grid_color = '#404040'
-                for i in range(self.width + 1):
-                    gx = off_x + int(i * pixel_size)
-                    if 0 <= gx < canvas_w:
-                        draw.line([gx, off_y, gx, off_y + sh], fill=grid_color)
-                for i in range(self.height + 1):
-                    gy = off_y + int(i * pixel_size)
-                    if 0 <= gy < canvas_h:
-                        draw.line([off_x, gy, off_x + sw, gy], fill=grid_color)
+            period = c_size * 2
+            # The visible source pixels may overhang the widget by up to one zoomed pixel per side
+            margin = period + 2 * math.ceil(pixel_size)
+            checker = self._checkerboard(c_size, (canvas_w + margin, canvas_h + margin))
+            phase_x = (dst_x0 - off_x) % period
+            phase_y = (dst_y0 - off_y) % period
+            view_img.paste(checker.crop((phase_x, phase_y, phase_x + dst_x1 - dst_x0, phase_y + dst_y1 - dst_y0)),
+                           (dst_x0, dst_y0))
             
-            # 8. Draw selection outlines
-            for obj in self.object_manager.selected_objects:
-                if hasattr(obj, 'get_bounds'):
-                    bx0, by0, bx1, by1 = obj.get_bounds()
-                    sx0 = off_x + int((bx0 - 0.5) * pixel_size)
-                    sy0 = off_y + int((by0 - 0.5) * pixel_size)
-                    sx1 = off_x + int((bx1 + 0.5) * pixel_size)
-                    sy1 = off_y + int((by1 + 0.5) * pixel_size)
-                    draw.rectangle([sx0, sy0, sx1, sy1], outline='#00ffff', width=2)
-            
-            # 9. Update Graphics
-            self.photo_image = ImageTk.PhotoImage(view_img)
-            self.canvas.delete("all")
-            self.canvas.create_image(0, 0, image=self.photo_image, anchor=tk.NW)
-            
-            # 10. Update Scrollbars
-            max_view_w = max(canvas_w, sw + 400)
-            max_view_h = max(canvas_h, sh + 400)
-            vx = 0.5 - (self.pan_offset[0] / max_view_w)
-            vy = 0.5 - (self.pan_offset[1] / max_view_h)
-            self.h_scrollbar.set(max(0, vx-0.1), min(1, vx+0.1))
-            self.v_scrollbar.set(max(0, vy-0.1), min(1, vy+0.1))
-            
-            self.need_render = False
-            
-        except Exception as e:
-            print(f"Render error: {e}")
-            import traceback
-            traceback.print_exc()
-
+            # 7. Scale only the visible crop and paste it
+            scaled_project = project_img.resize((dst_x1 - dst_x0, dst_y1 - dst_y0), Image.NEAREST)
+            view_img.paste(scaled_project, (dst_x0, dst_y0), scaled_project)
+        
+        # 8. Draw Grid
+        if request.show_grid and pixel_size >= 4:
+            grid = self._grid_mask(pixel_size, (width, height), (canvas_w, canvas_h), (off_x, off_y))
+            if grid:
+                position, mask = grid
+                view_img.paste('#404040', position, mask)
+        
+        return view_img
+    
+    def _checkerboard(self, c_size, size):
+        """Transparency checkerboard with c_size squares, starting on a light square at (0, 0)"""
+        key = (c_size, size)
+        if self._checker_cache and self._checker_cache[0] == key:
+            return self._checker_cache[1]
+        
+        period = c_size * 2
+        pattern = Image.new('RGB', (period, period), (200, 200, 200))
+        p_draw = ImageDraw.Draw(pattern)
+        p_draw.rectangle([0, 0, c_size-1, c_size-1], fill=(220, 220, 220))
+        p_draw.rectangle([c_size, c_size, period-1, period-1], fill=(220, 220, 220))
+        
+        checker = Image.new('RGB', size)
+        for y in range(0, size[1], period):
+            for x in range(0, size[0], period):
+                checker.paste(pattern, (x, y))
+        
+        self._checker_cache = (key, checker)
+        return checker
+    
+    def _grid_mask(self, pixel_size, canvas_size, view_size, offset):
+        """
+        Pixel grid as (position, 'L' mask) clipped to the view, or None if it is off screen.
+        Line positions only depend on zoom and canvas size, so they are kept as one-pixel
+        column/row masks and stretched to the view in C instead of drawn line by line.
+        """
+        key = (pixel_size, canvas_size, view_size, offset)
+        if self._grid_cache and self._grid_cache[0] == key:
+            return self._grid_cache[1]
+        
+        width, height = canvas_size
+        sw, sh = int(width * pixel_size), int(height * pixel_size)
+        lines_key = (pixel_size, canvas_size)
+        if not self._grid_lines or self._grid_lines[0] != lines_key:
+            cols = bytearray(sw + 1)
+            for i in range(width + 1):
+                cols[int(i * pixel_size)] = 255
+            rows = bytearray(sh + 1)
+            for i in range(height + 1):
+                rows[int(i * pixel_size)] = 255
+            self._grid_lines = (lines_key,
+                                Image.frombytes('L', (sw + 1, 1), bytes(cols)),
+                                Image.frombytes('L', (1, sh + 1), bytes(rows)))
+        _, cols, rows = self._grid_lines
+        
+        # Grid area (lines included) clipped to the view
+        (canvas_w, canvas_h), (off_x, off_y) = view_size, offset
+        gx0, gy0 = max(0, off_x), max(0, off_y)
+        gx1, gy1 = min(canvas_w, off_x + sw + 1), min(canvas_h, off_y + sh + 1)
+        grid = None
+        if gx0 < gx1 and gy0 < gy1:
+            size = (gx1 - gx0, gy1 - gy0)
+            vertical = cols.crop((gx0 - off_x, 0, gx1 - off_x, 1)).resize(size, Image.NEAREST)
+            horizontal = rows.crop((0, gy0 - off_y, 1, gy1 - off_y)).resize(size, Image.NEAREST)
+            grid = ((gx0, gy0), ImageChops.lighter(vertical, horizontal))
+        
+        self._grid_cache = (key, grid)
+        return grid
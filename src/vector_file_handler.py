@@ -16,7 +16,7 @@ class VectorFileHandler:
         mgr_data = canvas.object_manager.to_dict()
         
         data = {
-            "version": "2.1",
+            "version": "2.7",
             "width": canvas.width,
             "height": canvas.height,
             "layers": mgr_data['layers'],
@@ -30,6 +30,9 @@ class VectorFileHandler:
                 "software": "PixeLab Vector"
             }
         }
+        for key in ('color_table', 'symbols'):
+            if key in mgr_data:
+                data[key] = mgr_data[key]
         
         # Ensure .plb extension
         if not filepath.endswith('.plb'):
@@ -49,8 +52,8 @@ class VectorFileHandler:
         # Version check
         version = data.get('version', '1.0')
         
-        # Support both old pixel-based (1.0) and new vector-based (2.0/2.1) formats
-        if version not in ['1.0', '2.0', '2.1']:
+        # Support both old pixel-based (1.0) and new vector-based (2.0 to 2.7) formats
+        if version not in ['1.0', '2.0', '2.1', '2.2', '2.3', '2.4', '2.5', '2.6', '2.7']:
             raise ValueError(f"Unsupported PLB version: {version}")
         
         return data
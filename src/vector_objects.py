@@ -3,26 +3,205 @@ Vector Objects - All drawable objects stored as vectors
 Objects are rendered as pixels with anti-aliasing but remain editable as vectors
 """
 from abc import ABC, abstractmethod
+from array import array
 from typing import List, Tuple
 import copy
+import base64
+import io
+import itertools
+import math
+from .tile_cache import OffsetDraw, ShiftedDraw, pixel_rect, shift_xy
+
+
+SEGMENT_CELL = 16  # Cell size of VectorPath's hit-test segment grid
+SEGMENT_MAX_CELLS = 64  # Segments covering more cells are tested on every query
+
+
+_colors = {}  # Interned RGBA tuples, shared by every object using the same colour
+
+
+def intern_color(color):
+    """Shared tuple for an RGBA colour, so equal colours are stored once (palette indices pass through)"""
+    if isinstance(color, int):
+        return color
+    color = tuple(color)
+    return _colors.setdefault(color, color)
+
+
+def color_to_json(color):
+    """JSON value of an object colour: [r, g, b, a], or an int index in indexed documents"""
+    return color if isinstance(color, int) else list(color)
+
+
+def color_from_json(value):
+    return value if isinstance(value, int) else tuple(value)
+
+
+def _paint_mask(image):
+    """'L' mask that is 255 wherever an image is painted: any alpha, or any colour index but 0"""
+    from PIL import Image
+    if image.mode == 'P':
+        # Read the indices as plain 'L' values: point() on a 'P' image returns one that
+        # reports mode 'L' but still copies (e.g. into undo history) as 'P'
+        image = Image.frombytes('L', image.size, image.tobytes())
+        return image.point(lambda i: 255 if i else 0)
+    return image.getchannel('A').point(lambda a: 255 if a else 0)
+
+
+def index_image(image, table):
+    """
+    'P' image of ColorTable indices for an RGBA image (fully transparent pixels become 0).
+    It carries the table's colours as its palette, which PNG needs to keep the indices.
+    """
+    from PIL import Image
+    lut = {bytes(color): table.index_of(color) if color[3] else 0
+           for _count, color in image.getcolors(image.width * image.height) or ()}
+    raw = image.tobytes()
+    indexed = Image.frombytes('P', image.size, bytes(lut[raw[i:i + 4]] for i in range(0, len(raw), 4)))
+    indexed.putpalette(table.palette_data().ljust(4 * table.MAX_COLORS, b'\0'), 'RGBA')
+    return indexed
+
+
+def expand_image(image, table):
+    """RGBA image for a 'P' image of ColorTable indices"""
+    image = image.copy()
+    image.putpalette(table.palette_data(), 'RGBA')
+    return image.convert('RGBA')
+
+
+def _compact_number(value):
+    """Float32 coordinate as a short JSON number: ints stay ints, fractions are rounded"""
+    return int(value) if value.is_integer() else round(value, 3)
+
+
+# Persistent object IDs: monotonically increasing, never reused within a session,
+# and saved in .plb so they survive a save/load round trip
+_id_counter = itertools.count(1)
+_last_id = 0
+
+
+def _collapse_collinear(xs, ys):
+    """Indices of the points left after dropping repeats and interior points of straight runs"""
+    keep = [0]
+    last = len(xs) - 1
+    for i in range(1, last):
+        k = keep[-1]
+        ax, ay = xs[i] - xs[k], ys[i] - ys[k]
+        bx, by = xs[i + 1] - xs[i], ys[i + 1] - ys[i]
+        if ax == 0 and ay == 0:
+            continue
+        if ax * by - ay * bx == 0 and ax * bx + ay * by >= 0:
+            continue  # i lies on the straight segment from the last kept point to i + 1
+        keep.append(i)
+    keep.append(last)
+    return keep
+
+
+def _douglas_peucker(xs, ys, indices, tolerance):
+    """Subset of indices (first and last always kept) whose polyline stays within tolerance of the input"""
+    if len(indices) < 3:
+        return indices
+    tol_sq = tolerance * tolerance
+    keep = [False] * len(indices)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(indices) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[indices[first]], ys[indices[first]]
+        bx, by = xs[indices[last]], ys[indices[last]]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        worst, worst_sq = None, tol_sq
+        for j in range(first + 1, last):
+            px, py = xs[indices[j]] - ax, ys[indices[j]] - ay
+            if length_sq:
+                t = max(0.0, min(1.0, (px * dx + py * dy) / length_sq))
+                px, py = px - t * dx, py - t * dy
+            dist_sq = px * px + py * py
+            if dist_sq > worst_sq:
+                worst, worst_sq = j, dist_sq
+        if worst is not None:
+            keep[worst] = True
+            stack.append((first, worst))
+            stack.append((worst, last))
+    return [index for index, kept in zip(indices, keep) if kept]
+
+
+def next_object_id() -> int:
+    """Allocate a new, never used object ID"""
+    global _last_id
+    _last_id = next(_id_counter)
+    return _last_id
+
+
+def reserve_object_id(object_id: int):
+    """Make sure IDs allocated from now on are greater than object_id (e.g. one loaded from a file)"""
+    global _id_counter, _last_id
+    if object_id > _last_id:
+        _last_id = object_id
+        _id_counter = itertools.count(object_id + 1)
 
 
 class VectorObject(ABC):
-    """Base class for all vector objects"""
+    """Base class for all vector objects
+
+    Objects use __slots__ instead of a per-instance __dict__, so documents with
+    many objects stay small; subclasses list their own fields in __slots__.
+    """
+    __slots__ = ('_color', 'id', 'parent', '_bounds')
+    recolorable = True  # Whether the object is drawn in its color (bitmaps keep their own pixels)
     
     def __init__(self, color=(0, 0, 0, 255)):
         self.color = color
-        self.selected = False
-        self.id = id(self)
+        self.id = next_object_id()
+        self.parent = None  # VectorGroup holding this object, if any
+        self._bounds = None  # Cached get_bounds() result
+    
+    @property
+    def color(self):
+        return self._color
+    
+    @color.setter
+    def color(self, color):
+        self._color = intern_color(color)
     
-    @abstractmethod
     def get_bounds(self) -> Tuple[int, int, int, int]:
-        """Get bounding box (min_x, min_y, max_x, max_y)"""
+        """
+        Get bounding box (min_x, min_y, max_x, max_y), cached until the geometry changes.
+        Simple shapes alias this to compute_bounds: recomputing is as cheap as the cache
+        and saves a tuple per object.
+        """
+        bounds = self._bounds
+        if bounds is None:
+            bounds = self._bounds = self.compute_bounds()
+        return bounds
+    
+    @abstractmethod
+    def compute_bounds(self) -> Tuple[int, int, int, int]:
+        """Bounding box computed from the geometry"""
         pass
     
+    def invalidate_bounds(self):
+        """Drop cached bounds here and in enclosing groups; call after editing geometry attributes directly"""
+        obj = self
+        while obj is not None:
+            obj._bounds = None
+            obj = obj.parent
+    
+    def _shift_bounds(self, dx, dy):
+        """Move cached bounds along with a translation instead of recomputing them"""
+        bounds = self._bounds
+        if self.parent is not None:
+            self.parent.invalidate_bounds()
+        if bounds is not None:
+            self._bounds = (bounds[0] + dx, bounds[1] + dy, bounds[2] + dx, bounds[3] + dy)
+    
     @abstractmethod
-    def draw_to_image(self, draw: 'ImageDraw.Draw'):
-        """Directly draw to a PIL ImageDraw object for maximum performance"""
+    def draw_to_image(self, draw: OffsetDraw):
+        """
+        Draw through a drawing proxy: an OffsetDraw, or an IdDraw/ShiftedDraw wrapping one.
+        Proxies offer ImageDraw's point/line/rectangle/ellipse plus paste for bitmaps.
+        """
         pass
     
     @abstractmethod
@@ -43,6 +222,18 @@ class VectorObject(ABC):
         """Move object by (dx, dy)"""
         pass
     
+    def bake_transform(self):
+        """Write a pending (lazily applied) translation into the stored geometry; primitives move eagerly"""
+        pass
+    
+    def to_indexed(self, table):
+        """Store the colour as an index into a ColorTable (indexed-colour documents)"""
+        self.color = table.index_of(self.color)
+    
+    def to_rgba(self, table):
+        """Store the colour as RGBA again, resolving an index through the table"""
+        self.color = table.resolve(self.color)
+    
     @abstractmethod
     def to_dict(self) -> dict:
         """Serialize to dictionary"""
@@ -57,18 +248,21 @@ class VectorObject(ABC):
 
 class VectorPixel(VectorObject):
     """Single pixel - the most basic vector object"""
+    __slots__ = ('x', 'y')
     
     def __init__(self, x, y, color=(0, 0, 0, 255)):
         super().__init__(color)
         self.x = x
         self.y = y
     
-    def draw_to_image(self, draw: 'ImageDraw.Draw'):
+    def draw_to_image(self, draw: OffsetDraw):
         draw.point((self.x, self.y), fill=self.color)
     
-    def get_bounds(self):
+    def compute_bounds(self):
         return (self.x, self.y, self.x, self.y)
     
+    get_bounds = compute_bounds
+    
     def rasterize(self, width, height):
         if 0 <= self.x < width and 0 <= self.y < height:
             return [(self.x, self.y, self.color)]
@@ -80,22 +274,25 @@ class VectorPixel(VectorObject):
     def translate(self, dx, dy):
         self.x += dx
         self.y += dy
+        self._shift_bounds(dx, dy)
     
     def to_dict(self):
         return {
             'type': 'pixel',
+            'id': self.id,
             'x': self.x,
             'y': self.y,
-            'color': list(self.color)
+            'color': color_to_json(self.color)
         }
     
     @staticmethod
     def from_dict(data):
-        return VectorPixel(data['x'], data['y'], tuple(data['color']))
+        return VectorPixel(data['x'], data['y'], color_from_json(data['color']))
 
 
 class VectorLine(VectorObject):
     """Vector line - stored as endpoints, rendered with anti-aliasing"""
+    __slots__ = ('x0', 'y0', 'x1', 'y1', 'thickness')
     
     def __init__(self, x0, y0, x1, y1, color=(0, 0, 0, 255), thickness=1):
         super().__init__(color)
@@ -103,17 +300,20 @@ class VectorLine(VectorObject):
         self.x1, self.y1 = x1, y1
         self.thickness = thickness
     
-    def draw_to_image(self, draw: 'ImageDraw.Draw'):
+    def draw_to_image(self, draw: OffsetDraw):
         draw.line([(self.x0, self.y0), (self.x1, self.y1)], fill=self.color, width=self.thickness)
     
-    def get_bounds(self):
+    def compute_bounds(self):
+        r = self.thickness // 2
         return (
-            min(self.x0, self.x1),
-            min(self.y0, self.y1),
-            max(self.x0, self.x1),
-            max(self.y0, self.y1)
+            min(self.x0, self.x1) - r,
+            min(self.y0, self.y1) - r,
+            max(self.x0, self.x1) + r,
+            max(self.y0, self.y1) + r
         )
     
+    get_bounds = compute_bounds
+    
     def rasterize(self, width, height):
         """Xiaolin Wu's line algorithm for anti-aliasing"""
         pixels = []
@@ -173,13 +373,15 @@ class VectorLine(VectorObject):
         self.y0 += dy
         self.x1 += dx
         self.y1 += dy
+        self._shift_bounds(dx, dy)
     
     def to_dict(self):
         return {
             'type': 'line',
+            'id': self.id,
             'x0': self.x0, 'y0': self.y0,
             'x1': self.x1, 'y1': self.y1,
-            'color': list(self.color),
+            'color': color_to_json(self.color),
             'thickness': self.thickness
         }
     
@@ -187,12 +389,13 @@ class VectorLine(VectorObject):
     def from_dict(data):
         return VectorLine(
             data['x0'], data['y0'], data['x1'], data['y1'],
-            tuple(data['color']), data.get('thickness', 1)
+            color_from_json(data['color']), data.get('thickness', 1)
         )
 
 
 class VectorRectangle(VectorObject):
     """Vector rectangle"""
+    __slots__ = ('x0', 'y0', 'x1', 'y1', 'filled')
     
     def __init__(self, x0, y0, x1, y1, color=(0, 0, 0, 255), filled=False):
         super().__init__(color)
@@ -202,15 +405,17 @@ class VectorRectangle(VectorObject):
         self.y1 = max(y0, y1)
         self.filled = filled
     
-    def draw_to_image(self, draw: 'ImageDraw.Draw'):
+    def draw_to_image(self, draw: OffsetDraw):
         if self.filled:
             draw.rectangle([self.x0, self.y0, self.x1, self.y1], fill=self.color)
         else:
             draw.rectangle([self.x0, self.y0, self.x1, self.y1], outline=self.color)
     
-    def get_bounds(self):
+    def compute_bounds(self):
         return (self.x0, self.y0, self.x1, self.y1)
     
+    get_bounds = compute_bounds
+    
     def rasterize(self, width, height):
         pixels = []
         
@@ -249,13 +454,15 @@ class VectorRectangle(VectorObject):
         self.y0 += dy
         self.x1 += dx
         self.y1 += dy
+        self._shift_bounds(dx, dy)
     
     def to_dict(self):
         return {
             'type': 'rectangle',
+            'id': self.id,
             'x0': self.x0, 'y0': self.y0,
             'x1': self.x1, 'y1': self.y1,
-            'color': list(self.color),
+            'color': color_to_json(self.color),
             'filled': self.filled
         }
     
@@ -263,12 +470,13 @@ class VectorRectangle(VectorObject):
     def from_dict(data):
         return VectorRectangle(
             data['x0'], data['y0'], data['x1'], data['y1'],
-            tuple(data['color']), data.get('filled', False)
+            color_from_json(data['color']), data.get('filled', False)
         )
 
 
 class VectorCircle(VectorObject):
     """Vector circle"""
+    __slots__ = ('cx', 'cy', 'radius', 'filled')
     
     def __init__(self, cx, cy, radius, color=(0, 0, 0, 255), filled=False):
         super().__init__(color)
@@ -277,7 +485,7 @@ class VectorCircle(VectorObject):
         self.radius = radius
         self.filled = filled
     
-    def draw_to_image(self, draw: 'ImageDraw.Draw'):
+    def draw_to_image(self, draw: OffsetDraw):
         x0, y0 = self.cx - self.radius, self.cy - self.radius
         x1, y1 = self.cx + self.radius, self.cy + self.radius
         if self.filled:
@@ -285,7 +493,7 @@ class VectorCircle(VectorObject):
         else:
             draw.ellipse([x0, y0, x1, y1], outline=self.color)
     
-    def get_bounds(self):
+    def compute_bounds(self):
         return (
             self.cx - self.radius,
             self.cy - self.radius,
@@ -293,6 +501,8 @@ class VectorCircle(VectorObject):
             self.cy + self.radius
         )
     
+    get_bounds = compute_bounds
+    
     def rasterize(self, width, height):
         pixels = []
         
@@ -344,13 +554,15 @@ class VectorCircle(VectorObject):
     def translate(self, dx, dy):
         self.cx += dx
         self.cy += dy
+        self._shift_bounds(dx, dy)
     
     def to_dict(self):
         return {
             'type': 'circle',
+            'id': self.id,
             'cx': self.cx, 'cy': self.cy,
             'radius': self.radius,
-            'color': list(self.color),
+            'color': color_to_json(self.color),
             'filled': self.filled
         }
     
@@ -358,51 +570,160 @@ class VectorCircle(VectorObject):
     def from_dict(data):
         return VectorCircle(
             data['cx'], data['cy'], data['radius'],
-            tuple(data['color']), data.get('filled', False)
+            color_from_json(data['color']), data.get('filled', False)
         )
 
 
 class VectorPath(VectorObject):
-    """Vector path for freeform curves (Bezier, etc.)"""
+    """Vector path for freeform curves (Bezier, etc.)
+
+    Points are stored flat in a float32 array (x0, y0, x1, y1, ...) that is handed
+    to ImageDraw as is. Hit-testing goes through a segment grid built on first use.
+    translate only updates offset, which is added when drawing and hit-testing
+    until bake_transform writes it into coords.
+    """
+    __slots__ = ('coords', 'thickness', 'closed', 'offset', '_segments')
     
-    def __init__(self, points, color=(0, 0, 0, 255), thickness=1, closed=False):
+    def __init__(self, points=(), color=(0, 0, 0, 255), thickness=1, closed=False, coords=None):
         super().__init__(color)
-        self.points = points  # List of (x, y) tuples
+        if coords is None:
+            coords = [v for p in points for v in p]
+        self.coords = array('f', coords)
         self.thickness = thickness
         self.closed = closed
+        self.offset = (0, 0)  # Pending translation of coords
+        self._segments = None  # (cells, long segments) over coords, for contains_point
     
-    def draw_to_image(self, draw: 'ImageDraw.Draw'):
-        if len(self.points) < 1: return
-        if len(self.points) == 1:
+    @property
+    def points(self):
+        """List of (x, y) tuples (a copy; use add_point or translate to edit)"""
+        c = self.coords
+        ox, oy = self.offset
+        return [(x + ox, y + oy) for x, y in zip(c[0::2], c[1::2])]
+    
+    @points.setter
+    def points(self, points):
+        self.coords = array('f', [v for p in points for v in p])
+        self.offset = (0, 0)
+        self.invalidate_bounds()
+    
+    def point_count(self):
+        return len(self.coords) // 2
+    
+    def point(self, index):
+        """Point at index as an (x, y) tuple; negative indices count from the end"""
+        c = self.coords
+        if index < 0:
+            index += len(c) // 2
+        return (c[2 * index] + self.offset[0], c[2 * index + 1] + self.offset[1])
+    
+    def draw_to_image(self, draw: OffsetDraw):
+        count = self.point_count()
+        if count < 1: return
+        if count == 1:
             # Single point behavior
             r = self.thickness / 2
-            x, y = self.points[0]
+            x, y = self.point(0)
             draw.ellipse([x-r, y-r, x+r, y+r], fill=self.color)
             return
 
-        draw.line(self.points, fill=self.color, width=self.thickness, joint="curve")
+        draw.line(shift_xy(self.coords, *self.offset), fill=self.color, width=self.thickness, joint="curve")
         if self.closed:
-            draw.line([self.points[-1], self.points[0]], fill=self.color, width=self.thickness)
+            draw.line([self.point(-1), self.point(0)], fill=self.color, width=self.thickness)
     
-    def get_bounds(self):
-        if not self.points:
+    def add_point(self, x, y):
+        """Append a point, growing the cached bounds instead of rescanning the path"""
+        self.coords.append(x - self.offset[0])
+        self.coords.append(y - self.offset[1])
+        self._segments = None
+        bounds = self._bounds
+        if self.parent is not None:
+            self.parent.invalidate_bounds()
+        if bounds is not None:
+            r = self.thickness / 2
+            self._bounds = (min(bounds[0], x - r), min(bounds[1], y - r),
+                            max(bounds[2], x + r), max(bounds[3], y + r))
+    
+    def invalidate_bounds(self):
+        self._segments = None
+        super().invalidate_bounds()
+    
+    def simplify(self, tolerance) -> int:
+        """
+        Drop points that lie within tolerance pixels of the simplified stroke:
+        collinear runs are collapsed first, then Ramer-Douglas-Peucker removes
+        the remaining near-collinear points. Returns the number of points removed.
+        """
+        c = self.coords
+        count = len(c) // 2
+        if tolerance <= 0 or count < 3:
+            return 0
+        
+        xs, ys = c[0::2].tolist(), c[1::2].tolist()
+        keep = _collapse_collinear(xs, ys)
+        keep = _douglas_peucker(xs, ys, keep, tolerance)
+        if len(keep) == count:
+            return 0
+        self.coords = array('f', [v for i in keep for v in (xs[i], ys[i])])
+        self.invalidate_bounds()
+        return count - len(keep)
+    
+    def compute_bounds(self):
+        c = self.coords
+        if not c:
             return (0, 0, 0, 0)
-        xs = [p[0] for p in self.points]
-        ys = [p[1] for p in self.points]
+        xs, ys = c[0::2], c[1::2]
+        ox, oy = self.offset
         r = self.thickness / 2
-        return (min(xs) - r, min(ys) - r, max(xs) + r, max(ys) + r)
+        return (min(xs) + ox - r, min(ys) + oy - r, max(xs) + ox + r, max(ys) + oy + r)
     
     def rasterize(self, width, height):
         # We don't really use this anymore since draw_to_image is the primary path
         return []
     
+    def _hit_radius_sq(self):
+        return max(4, (self.thickness/2 + 2)**2)
+    
+    def _segment_grid(self):
+        """Map grid cells to the indices of the segments passing near them, built lazily"""
+        if self._segments is not None:
+            return self._segments
+        
+        cs = SEGMENT_CELL
+        pad = math.sqrt(self._hit_radius_sq())
+        c = self.coords
+        cells = {}
+        long_segments = []
+        for i, (x0, y0, x1, y1) in enumerate(zip(c[0:-2:2], c[1:-2:2], c[2::2], c[3::2])):
+            cx0, cx1 = math.floor((min(x0, x1) - pad) / cs), math.floor((max(x0, x1) + pad) / cs)
+            cy0, cy1 = math.floor((min(y0, y1) - pad) / cs), math.floor((max(y0, y1) + pad) / cs)
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > SEGMENT_MAX_CELLS:
+                long_segments.append(i)
+                continue
+            for cy in range(cy0, cy1 + 1):
+                for cx in range(cx0, cx1 + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket is None:
+                        cells[(cx, cy)] = bucket = []
+                    bucket.append(i)
+        
+        self._segments = (cells, long_segments)
+        return self._segments
+    
     def contains_point(self, x, y):
         # Check if point is near any segment of the path
         # Factor in thickness
-        r_sq = max(4, (self.thickness/2 + 2)**2)
-        for i in range(len(self.points) - 1):
-            x0, y0 = self.points[i]
-            x1, y1 = self.points[i + 1]
+        bx0, by0, bx1, by1 = self.get_bounds()
+        if not (bx0 - 2 <= x <= bx1 + 2 and by0 - 2 <= y <= by1 + 2):
+            return False
+        
+        cells, long_segments = self._segment_grid()
+        c = self.coords
+        x, y = x - self.offset[0], y - self.offset[1]  # Test in the untranslated frame of coords
+        bucket = cells.get((math.floor(x / SEGMENT_CELL), math.floor(y / SEGMENT_CELL)), ())
+        r_sq = self._hit_radius_sq()
+        for i in itertools.chain(bucket, long_segments):
+            x0, y0, x1, y1 = c[2*i], c[2*i + 1], c[2*i + 2], c[2*i + 3]
             
             length_sq = (x1 - x0)**2 + (y1 - y0)**2
             if length_sq == 0:
@@ -419,49 +740,185 @@ class VectorPath(VectorObject):
         return False
     
     def translate(self, dx, dy):
-        self.points = [(x + dx, y + dy) for x, y in self.points]
+        self.offset = (self.offset[0] + dx, self.offset[1] + dy)
+        self._shift_bounds(dx, dy)
+    
+    def bake_transform(self):
+        ox, oy = self.offset
+        if not ox and not oy:
+            return
+        self.coords = array('f', shift_xy(self.coords, ox, oy))
+        self.offset = (0, 0)
+        self._segments = None
     
     def to_dict(self):
         return {
             'type': 'path',
-            'points': self.points,
-            'color': list(self.color),
+            'id': self.id,
+            'coords': [_compact_number(v) for v in shift_xy(self.coords, *self.offset)],
+            'color': color_to_json(self.color),
             'thickness': self.thickness,
             'closed': self.closed
         }
     
     @staticmethod
     def from_dict(data):
+        if 'coords' in data:
+            points, coords = (), data['coords']
+        else:
+            # Files older than 2.3 store [[x, y], ...]
+            points, coords = data['points'], None
         return VectorPath(
-            [tuple(p) for p in data['points']],
-            tuple(data['color']),
+            points,
+            color_from_json(data['color']),
             data.get('thickness', 1),
-            data.get('closed', False)
+            data.get('closed', False),
+            coords=coords
         )
 
 
+class VectorBitmap(VectorObject):
+    """Raster image placed at (x, y), e.g. imported art
+
+    Drawn with a single paste: pixels with any alpha replace what is below,
+    like the VectorPixel objects it stands in for. In indexed documents the image
+    is a 'P' image of ColorTable indices, where index 0 is transparent.
+    """
+    __slots__ = ('x', 'y', 'image', 'name', '_mask')
+    recolorable = False
+    
+    def __init__(self, x, y, image, name="Bitmap", indexed=False):
+        super().__init__()
+        self.x = x
+        self.y = y
+        if indexed:
+            self.image = image if image.mode == 'P' else image.convert('P')
+        else:
+            self.image = image if image.mode == 'RGBA' else image.convert('RGBA')
+        self.name = name
+        self._mask = None  # 'L' mask: 255 where the image has any alpha (or a non-zero index)
+    
+    @property
+    def width(self):
+        return self.image.width
+    
+    @property
+    def height(self):
+        return self.image.height
+    
+    @property
+    def indexed(self):
+        return self.image.mode == 'P'
+    
+    def mask(self):
+        if self._mask is None:
+            self._mask = _paint_mask(self.image)
+        return self._mask
+    
+    def _painted(self, value):
+        """Whether an image pixel value is drawn: any alpha, or any index but 0"""
+        return value > 0 if self.indexed else value[3] > 0
+    
+    def draw_to_image(self, draw: OffsetDraw):
+        draw.paste((self.x, self.y), self.image, self.mask())
+    
+    def compute_bounds(self):
+        return (self.x, self.y, self.x + max(0, self.width - 1), self.y + max(0, self.height - 1))
+    
+    def rasterize(self, width, height):
+        pixels = []
+        data = self.image.load()
+        for y in range(max(0, -self.y), min(self.height, height - self.y)):
+            for x in range(max(0, -self.x), min(self.width, width - self.x)):
+                color = data[x, y]
+                if self._painted(color):
+                    pixels.append((self.x + x, self.y + y, color))
+        return pixels
+    
+    def contains_point(self, x, y):
+        lx, ly = math.floor(x) - self.x, math.floor(y) - self.y
+        if 0 <= lx < self.width and 0 <= ly < self.height:
+            return self._painted(self.image.getpixel((lx, ly)))
+        return False
+    
+    def translate(self, dx, dy):
+        self.x += dx
+        self.y += dy
+        self._shift_bounds(dx, dy)
+    
+    def to_indexed(self, table):
+        """Replace the RGBA image by a 'P' image of table indices (fully transparent pixels become 0)"""
+        if not self.indexed:
+            self.image = index_image(self.image, table)
+            self._mask = None
+    
+    def to_rgba(self, table):
+        if self.indexed:
+            self.image = expand_image(self.image, table)
+            self._mask = None
+    
+    def to_dict(self):
+        buffer = io.BytesIO()
+        self.image.save(buffer, 'PNG', optimize=True)
+        data = {
+            'type': 'bitmap',
+            'id': self.id,
+            'name': self.name,
+            'x': self.x, 'y': self.y,
+            'width': self.width, 'height': self.height,
+            'png': base64.b64encode(buffer.getvalue()).decode('ascii')
+        }
+        if self.indexed:
+            data['indexed'] = True
+        return data
+    
+    @staticmethod
+    def from_dict(data):
+        from PIL import Image
+        image = Image.open(io.BytesIO(base64.b64decode(data['png'])))
+        image.load()
+        return VectorBitmap(data['x'], data['y'], image, data.get('name', 'Bitmap'), data.get('indexed', False))
+
+
 class VectorGroup(VectorObject):
-    """Group of vector objects that can be manipulated together"""
+    """Group of vector objects that can be manipulated together
+
+    Moving a group only updates its offset; the children keep their coordinates
+    (relative to the group) until bake_transform moves them.
+    """
+    __slots__ = ('objects', 'name', 'offset')
     
     def __init__(self, objects=None, name="Group"):
         super().__init__()
         self.objects = objects or []
         self.name = name
+        self.offset = (0, 0)  # Pending translation of all children
+        for obj in self.objects:
+            obj.parent = self
     
     def add_object(self, obj):
         """Add object to group"""
+        if self.offset != (0, 0):
+            obj.translate(-self.offset[0], -self.offset[1])
         self.objects.append(obj)
+        obj.parent = self
+        self.invalidate_bounds()
     
     def remove_object(self, obj):
         """Remove object from group"""
         if obj in self.objects:
             self.objects.remove(obj)
+            obj.parent = None
+            obj.translate(*self.offset)
+            self.invalidate_bounds()
     
-    def draw_to_image(self, draw: 'ImageDraw.Draw'):
+    def draw_to_image(self, draw: OffsetDraw):
+        if self.offset != (0, 0):
+            draw = ShiftedDraw(draw, *self.offset)
         for obj in self.objects:
             obj.draw_to_image(draw)
     
-    def get_bounds(self):
+    def compute_bounds(self):
         """Get bounding box of all objects in group"""
         if not self.objects:
             return (0, 0, 0, 0)
@@ -472,7 +929,8 @@ class VectorGroup(VectorObject):
         max_x = max(b[2] for b in bounds)
         max_y = max(b[3] for b in bounds)
         
-        return (min_x, min_y, max_x, max_y)
+        ox, oy = self.offset
+        return (min_x + ox, min_y + oy, max_x + ox, max_y + oy)
     
     def rasterize(self, width, height):
         """Rasterize all objects in group"""
@@ -483,32 +941,58 @@ class VectorGroup(VectorObject):
     
     def contains_point(self, x, y):
         """Check if any object in group contains point"""
+        x, y = x - self.offset[0], y - self.offset[1]
         for obj in self.objects:
             if obj.contains_point(x, y):
                 return True
         return False
     
     def translate(self, dx, dy):
-        """Translate all objects in group"""
+        """Translate all objects in group (deferred until bake_transform)"""
+        self.offset = (self.offset[0] + dx, self.offset[1] + dy)
+        self._shift_bounds(dx, dy)
+    
+    def bake_transform(self):
+        """Move the children by the pending offset, then bake theirs"""
+        ox, oy = self.offset
+        bounds = self._bounds
+        self.offset = (0, 0)
+        for obj in self.objects:
+            if ox or oy:
+                obj.translate(ox, oy)
+            obj.bake_transform()
+        self._bounds = bounds  # Unchanged overall; children reset it while moving
+    
+    def to_indexed(self, table):
         for obj in self.objects:
-            obj.translate(dx, dy)
+            obj.to_indexed(table)
+    
+    def to_rgba(self, table):
+        for obj in self.objects:
+            obj.to_rgba(table)
     
     def ungroup(self):
         """Return list of ungrouped objects"""
+        self.bake_transform()
+        for obj in self.objects:
+            obj.parent = None
         return self.objects.copy()
     
     def to_dict(self):
+        """Serialize (bakes pending translations first, so children are saved in canvas coordinates)"""
+        self.bake_transform()
         return {
             'type': 'group',
+            'id': self.id,
             'name': self.name,
             'objects': [obj.to_dict() for obj in self.objects]
         }
     
     @staticmethod
-    def from_dict(data):
+    def from_dict(data, symbols=None):
         objects = []
         for obj_data in data.get('objects', []):
-            obj = create_object_from_dict(obj_data)
+            obj = create_object_from_dict(obj_data, symbols)
             if obj:
                 objects.append(obj)
         
@@ -516,6 +1000,210 @@ class VectorGroup(VectorObject):
         return group
 
 
+class Symbol:
+    """Shared definition of a repeated motif, placed on the canvas by VectorInstance objects
+
+    The objects are stored once, in symbol coordinates, and rendered once into a
+    sprite that every instance pastes at its own offset. A definition is not edited
+    in place: ungrouping an instance gives independent copies to edit instead.
+    """
+    
+    def __init__(self, objects=None, name="Symbol"):
+        self.id = next_object_id()
+        self.objects = objects or []
+        self.name = name
+        self.indexed = False  # Object colours are ColorTable indices (indexed documents)
+        self._bounds = None
+        self._sprite = None  # (image, mask, (x, y) of the image's top-left), rendered on first use
+    
+    def __getstate__(self):
+        # Copies (undo history) render their own sprite on demand
+        state = self.__dict__.copy()
+        state['_sprite'] = None
+        return state
+    
+    def get_bounds(self):
+        if self._bounds is None:
+            if not self.objects:
+                self._bounds = (0, 0, 0, 0)
+            else:
+                bounds = [obj.get_bounds() for obj in self.objects]
+                self._bounds = (min(b[0] for b in bounds), min(b[1] for b in bounds),
+                                max(b[2] for b in bounds), max(b[3] for b in bounds))
+        return self._bounds
+    
+    def sprite(self):
+        """The motif rendered at offset (0, 0): an RGBA (or indexed 'P') image, its paint mask and its origin"""
+        sprite = self._sprite
+        if sprite is None:
+            from PIL import Image
+            x0, y0, x1, y1 = pixel_rect(self.get_bounds())
+            image = Image.new('P' if self.indexed else 'RGBA', (x1 - x0, y1 - y0), 0)
+            draw = OffsetDraw(image, x0, y0)
+            for obj in self.objects:
+                obj.draw_to_image(draw)
+            sprite = self._sprite = (image, _paint_mask(image), (x0, y0))
+        return sprite
+    
+    def to_indexed(self, table):
+        if not self.indexed:
+            for obj in self.objects:
+                obj.to_indexed(table)
+            self.indexed = True
+            self._sprite = None
+    
+    def to_rgba(self, table):
+        if self.indexed:
+            for obj in self.objects:
+                obj.to_rgba(table)
+            self.indexed = False
+            self._sprite = None
+    
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'objects': [obj.to_dict() for obj in self.objects]
+        }
+        if self.indexed:
+            data['indexed'] = True
+        return data
+    
+    @staticmethod
+    def from_dict(data, symbols=None):
+        """Load a definition; symbols holds the already loaded ones its objects may instance"""
+        objects = []
+        for obj_data in data.get('objects', []):
+            obj = create_object_from_dict(obj_data, symbols)
+            if obj:
+                objects.append(obj)
+        symbol = Symbol(objects, data.get('name', 'Symbol'))
+        symbol.indexed = data.get('indexed', False)
+        if 'id' in data:
+            symbol.id = int(data['id'])
+            reserve_object_id(symbol.id)
+        return symbol
+
+
+class VectorInstance(VectorObject):
+    """Placement of a Symbol at offset (x, y)
+
+    Only the reference and the offset are stored per instance; drawing pastes the
+    symbol's cached sprite, so a thousand copies of a motif cost one render of it.
+    """
+    __slots__ = ('symbol', 'x', 'y')
+    recolorable = False  # Colours belong to the shared symbol definition
+    
+    def __init__(self, symbol, x=0, y=0):
+        super().__init__()
+        self.symbol = symbol
+        self.x = x
+        self.y = y
+    
+    def draw_to_image(self, draw: OffsetDraw):
+        if float(self.x).is_integer() and float(self.y).is_integer():
+            image, mask, (sx, sy) = self.symbol.sprite()
+            draw.paste((sx + self.x, sy + self.y), image, mask)
+        else:
+            # A sprite only moves by whole pixels: draw the objects themselves
+            draw = ShiftedDraw(draw, self.x, self.y)
+            for obj in self.symbol.objects:
+                obj.draw_to_image(draw)
+    
+    def compute_bounds(self):
+        x0, y0, x1, y1 = self.symbol.get_bounds()
+        return (x0 + self.x, y0 + self.y, x1 + self.x, y1 + self.y)
+    
+    def rasterize(self, width, height):
+        image, mask, (sx, sy) = self.symbol.sprite()
+        ox, oy = math.floor(sx + self.x), math.floor(sy + self.y)
+        data, painted = image.load(), mask.load()
+        pixels = []
+        for y in range(max(0, -oy), min(image.height, height - oy)):
+            for x in range(max(0, -ox), min(image.width, width - ox)):
+                if painted[x, y]:
+                    pixels.append((ox + x, oy + y, data[x, y]))
+        return pixels
+    
+    def contains_point(self, x, y):
+        _image, mask, (sx, sy) = self.symbol.sprite()
+        lx, ly = math.floor(x - self.x) - sx, math.floor(y - self.y) - sy
+        if 0 <= lx < mask.width and 0 <= ly < mask.height:
+            return mask.getpixel((lx, ly)) > 0
+        return False
+    
+    def translate(self, dx, dy):
+        self.x += dx
+        self.y += dy
+        self._shift_bounds(dx, dy)
+    
+    def to_indexed(self, table):
+        self.symbol.to_indexed(table)
+    
+    def to_rgba(self, table):
+        self.symbol.to_rgba(table)
+    
+    def ungroup(self):
+        """Independent copies of the symbol's objects at this instance's position"""
+        objects = copy_objects(self.symbol.objects)
+        for obj in objects:
+            obj.translate(self.x, self.y)
+            obj.bake_transform()
+        return objects
+    
+    def to_dict(self):
+        return {
+            'type': 'instance',
+            'id': self.id,
+            'symbol': self.symbol.id,
+            'x': self.x,
+            'y': self.y
+        }
+    
+    @staticmethod
+    def from_dict(data, symbols=None):
+        symbol = (symbols or {}).get(data['symbol'])
+        if symbol is None:
+            raise ValueError(f"Instance of unknown symbol {data['symbol']}")
+        return VectorInstance(symbol, data['x'], data['y'])
+
+
+def symbols_used(objects) -> List[Symbol]:
+    """Symbols instanced by objects (inside groups and other symbols too), each after the ones it instances"""
+    found = {}
+    
+    def visit(objs):
+        for obj in objs:
+            if isinstance(obj, VectorInstance):
+                if obj.symbol.id not in found:
+                    visit(obj.symbol.objects)
+                    found[obj.symbol.id] = obj.symbol
+            elif isinstance(obj, VectorGroup):
+                visit(obj.objects)
+    
+    visit(objects)
+    return list(found.values())
+
+
+def copy_objects(objects) -> list:
+    """Deep copies of objects in which instances still share their (unchanged) symbols
+
+    Every copied object, including group children, gets a fresh ID, so the copies can
+    live in the same document as the originals.
+    """
+    memo = {id(symbol): symbol for symbol in symbols_used(objects)}
+    copies = [copy.deepcopy(obj, memo) for obj in objects]
+    
+    def renew_ids(objs):
+        for obj in objs:
+            obj.id = next_object_id()
+            if isinstance(obj, VectorGroup):
+                renew_ids(obj.objects)
+    
+    renew_ids(copies)
+    return copies
+
+
 # Object factory for deserialization
 OBJECT_TYPES = {
     'pixel': VectorPixel,
@@ -523,13 +1211,23 @@ OBJECT_TYPES = {
     'rectangle': VectorRectangle,
     'circle': VectorCircle,
     'path': VectorPath,
-    'group': VectorGroup
+    'bitmap': VectorBitmap,
+    'group': VectorGroup,
+    'instance': VectorInstance
 }
 
 
-def create_object_from_dict(data):
-    """Create vector object from dictionary"""
+def create_object_from_dict(data, symbols=None):
+    """Create vector object from dictionary; symbols maps symbol IDs to the loaded definitions"""
     obj_type = data.get('type')
     if obj_type in OBJECT_TYPES:
-        return OBJECT_TYPES[obj_type].from_dict(data)
+        if obj_type in ('group', 'instance'):
+            obj = OBJECT_TYPES[obj_type].from_dict(data, symbols)
+        else:
+            obj = OBJECT_TYPES[obj_type].from_dict(data)
+        if 'id' in data:
+            # Keep the saved ID; files older than 2.2 get fresh ones
+            obj.id = int(data['id'])
+            reserve_object_id(obj.id)
+        return obj
     return None
@@ -44,9 +44,10 @@ class VectorTool(ABC):
 class VectorPencilTool(VectorTool):
     """Creates VectorPixel or VectorPath objects"""
     
-    def __init__(self, color=(0, 0, 0, 255)):
+    def __init__(self, color=(0, 0, 0, 255), simplify_tolerance=0.0):
         super().__init__(color)
         self.current_path = None
+        self.simplify_tolerance = simplify_tolerance  # Pixels; 0 keeps every sample (pixel-exact)
     
     def on_press(self, x, y, object_manager):
         # Start new path
@@ -56,17 +57,19 @@ class VectorPencilTool(VectorTool):
     def on_drag(self, x, y, object_manager):
         if self.current_path:
             # Add point to path
-            if (x, y) != self.current_path.points[-1]:
-                self.current_path.points.append((x, y))
+            if (x, y) != self.current_path.point(-1):
+                self.current_path.add_point(x, y)
     
     def on_release(self, x, y, object_manager):
         if self.current_path:
-            if len(self.current_path.points) == 1:
+            if self.current_path.point_count() == 1:
                 # Single pixel
-                px, py = self.current_path.points[0]
-                object_manager.add_object(VectorPixel(px, py, self.color))
+                px, py = self.current_path.point(0)
+                object_manager.add_object(VectorPixel(int(px), int(py), self.color))
             else:
                 # Add path
+                if self.simplify_tolerance:
+                    self.current_path.simplify(self.simplify_tolerance)
                 object_manager.add_object(self.current_path)
             
             self.current_path = None
@@ -76,10 +79,11 @@ class VectorPencilTool(VectorTool):
 class VectorBrushTool(VectorTool):
     """Creates a single VectorPath for each brush stroke (High Performance)"""
     
-    def __init__(self, color=(0, 0, 0, 255), size=3):
+    def __init__(self, color=(0, 0, 0, 255), size=3, simplify_tolerance=0.0):
         super().__init__(color)
         self.size = size
         self.current_stroke = None
+        self.simplify_tolerance = simplify_tolerance  # Pixels; 0 keeps every sample
     
     def set_size(self, size):
         self.size = max(1, min(100, size))
@@ -92,12 +96,14 @@ class VectorBrushTool(VectorTool):
     def on_drag(self, x, y, object_manager):
         if self.current_stroke:
             # Add point to current stroke
-            if (x, y) != self.current_stroke.points[-1]:
-                self.current_stroke.points.append((x, y))
+            if (x, y) != self.current_stroke.point(-1):
+                self.current_stroke.add_point(x, y)
     
     def on_release(self, x, y, object_manager):
         if self.current_stroke:
             # Add the entire stroke as one object
+            if self.simplify_tolerance:
+                self.current_stroke.simplify(self.simplify_tolerance)
             object_manager.add_object(self.current_stroke)
             self.current_stroke = None
             self.preview_object = None
@@ -296,13 +302,15 @@ class VectorSelectTool(VectorTool):
     
     def on_drag(self, x, y, object_manager):
         if self.mode == 'move' and self.drag_start and self.selected_obj:
-            # Move selected objects
+            # Drag the selection as a floating sprite; the move is committed on release
             dx = x - self.drag_start[0]
             dy = y - self.drag_start[1]
             
-            if dx != 0 or dy != 0:
-                object_manager.translate_selected(dx, dy)
-                self.drag_start = (x, y)
+            floating = object_manager.floating
+            if floating is None and (dx != 0 or dy != 0):
+                floating = object_manager.begin_floating()
+            if floating is not None:
+                floating.offset = (dx, dy)
         
         elif self.mode == 'marquee' and self.drag_start:
             # Update marquee rectangle
@@ -315,19 +323,14 @@ class VectorSelectTool(VectorTool):
             )
     
     def on_release(self, x, y, object_manager):
+        if self.mode == 'move':
+            object_manager.end_floating()
+        
         if self.mode == 'marquee' and self.marquee_rect:
             # Select all objects within marquee
-            x1, y1, x2, y2 = self.marquee_rect
-            
-            for obj in object_manager:
-                # Get object bounds
-                bounds = obj.get_bounds()
-                obj_x1, obj_y1, obj_x2, obj_y2 = bounds
-                
-                # Check if object is within or intersects marquee
-                if (obj_x1 <= x2 and obj_x2 >= x1 and
-                    obj_y1 <= y2 and obj_y2 >= y1):
-                    object_manager.select_object(obj)
+            # Objects within or intersecting the marquee, found through the spatial index
+            for obj in object_manager.get_objects_in_rect(self.marquee_rect):
+                object_manager.select_object(obj)
         
         self.mode = None
         self.drag_start = None
@@ -364,6 +367,23 @@ class VectorFillTool(VectorTool):
         pass
 
 
+class VectorTileTool(VectorTool):
+    """Paints cells of the current tilemap layer with tile_index (0 erases)"""
+    
+    def __init__(self, tile_index=1):
+        super().__init__()
+        self.tile_index = tile_index
+    
+    def on_press(self, x, y, object_manager):
+        object_manager.paint_tile(x, y, self.tile_index)
+    
+    def on_drag(self, x, y, object_manager):
+        object_manager.paint_tile(x, y, self.tile_index)
+    
+    def on_release(self, x, y, object_manager):
+        pass
+
+
 # Alias for compatibility
 class VectorMouseTool(VectorSelectTool):
     """Mouse tool - alias for Select tool"""
@@ -0,0 +1,184 @@
+"""
+Z-Order List - Stacking order of a layer's objects
+Doubly linked list with integer labels: O(1) append, remove, move to front/back and
+single-step moves, plus a stable z-key per object for sorting hits without an index scan
+"""
+import threading
+
+
+class _Node:
+    __slots__ = ('obj', 'label', 'prev', 'next')
+
+    def __init__(self, obj, label):
+        self.obj = obj
+        self.label = label
+        self.prev = None
+        self.next = None
+
+
+class ZOrderList:
+    """Objects from bottom (first) to top (last)
+
+    Iteration and indexing go through a cached tuple snapshot, rebuilt after a
+    mutation, so the render thread can walk the order while the UI thread edits it.
+    """
+
+    def __init__(self, objects=()):
+        self._head = _Node(None, 0)  # Sentinels: head.next is the bottom object, tail.prev the top one
+        self._tail = _Node(None, 0)
+        self._head.next = self._tail
+        self._tail.prev = self._head
+        self._nodes = {}  # obj -> _Node
+        self._snapshot = ()
+        self._lock = threading.Lock()
+        for obj in objects:
+            self.append(obj)
+
+    def __getstate__(self):
+        return {'objects': list(self)}
+
+    def __setstate__(self, state):
+        self.__init__(state['objects'])
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, obj):
+        return obj in self._nodes
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __reversed__(self):
+        return reversed(self.snapshot())
+
+    def __getitem__(self, index):
+        return self.snapshot()[index]
+
+    def __repr__(self):
+        return f"ZOrderList({list(self)!r})"
+
+    def snapshot(self) -> tuple:
+        """Objects bottom to top as a tuple, cached until the next change"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                items = []
+                node = self._head.next
+                while node is not self._tail:
+                    items.append(node.obj)
+                    node = node.next
+                self._snapshot = snapshot = tuple(items)
+        return snapshot
+
+    def key(self, obj) -> int:
+        """Z-key of an object: higher keys are stacked above lower ones"""
+        return self._nodes[obj].label
+
+    def in_order(self, objs) -> list:
+        """Those of objs still in the list, bottom to top (safe while the UI thread edits it)"""
+        with self._lock:
+            nodes = self._nodes
+            keyed = [(nodes[obj].label, obj) for obj in objs if obj in nodes]
+        keyed.sort(key=lambda item: item[0])
+        return [obj for _label, obj in keyed]
+
+    # --- Mutation (UI thread) ---
+
+    def append(self, obj):
+        """Add an object on top"""
+        with self._lock:
+            self._link_before(self._tail, _Node(obj, 0))
+
+    def appendleft(self, obj):
+        """Add an object at the bottom"""
+        with self._lock:
+            self._link_after(self._head, _Node(obj, 0))
+
+    def remove(self, obj):
+        with self._lock:
+            self._unlink(self._nodes.pop(obj))
+            self._snapshot = None
+
+    def move_to_front(self, obj):
+        """Restack an object on top of all others"""
+        with self._lock:
+            node = self._nodes[obj]
+            if node.next is not self._tail:
+                self._unlink(node)
+                self._link_before(self._tail, node)
+
+    def move_to_back(self, obj):
+        """Restack an object below all others"""
+        with self._lock:
+            node = self._nodes[obj]
+            if node.prev is not self._head:
+                self._unlink(node)
+                self._link_after(self._head, node)
+
+    def move_up(self, obj) -> bool:
+        """Swap an object with the one directly above it; False if it is already on top"""
+        with self._lock:
+            node = self._nodes[obj]
+            above = node.next
+            if above is self._tail:
+                return False
+            self._swap(node, above)
+            return True
+
+    def move_down(self, obj) -> bool:
+        """Swap an object with the one directly below it; False if it is already at the bottom"""
+        with self._lock:
+            node = self._nodes[obj]
+            below = node.prev
+            if below is self._head:
+                return False
+            self._swap(below, node)
+            return True
+
+    def above(self, obj):
+        """Object directly above obj, or None"""
+        node = self._nodes[obj].next
+        return None if node is self._tail else node.obj
+
+    def below(self, obj):
+        """Object directly below obj, or None"""
+        node = self._nodes[obj].prev
+        return None if node is self._head else node.obj
+
+    # --- Internals (called with the lock held) ---
+
+    def _link_after(self, prev, node):
+        nxt = prev.next
+        node.prev, node.next = prev, nxt
+        prev.next = nxt.prev = node
+        self._nodes[node.obj] = node
+        self._snapshot = None
+        self._assign_label(node)
+
+    def _link_before(self, nxt, node):
+        self._link_after(nxt.prev, node)
+
+    def _unlink(self, node):
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        node.prev = node.next = None
+
+    def _swap(self, lower, upper):
+        """Exchange two adjacent nodes (lower directly below upper)"""
+        before, after = lower.prev, upper.next
+        before.next, upper.prev = upper, before
+        upper.next, lower.prev = lower, upper
+        lower.next, after.prev = after, lower
+        lower.label, upper.label = upper.label, lower.label
+        self._snapshot = None
+
+    def _assign_label(self, node):
+        """Label a node linked at either end one step beyond its neighbour (Python ints never overflow)"""
+        prev, nxt = node.prev, node.next
+        if prev is not self._head:
+            node.label = prev.label + 1
+        elif nxt is not self._tail:
+            node.label = nxt.label - 1
+        else:
+            node.label = 0
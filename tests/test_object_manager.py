@@ -0,0 +1,168 @@
+"""
+ObjectManager editing operations
+"""
+from src.object_manager import ObjectManager
+from src.vector_objects import VectorPixel, VectorRectangle
+
+
+RED = (255, 0, 0, 255)
+BLUE = (0, 0, 255, 255)
+
+
+def all_ids(data):
+    """Every object id in a to_dict() tree, including group children and symbol contents"""
+    ids = []
+    
+    def visit(objects):
+        for obj in objects:
+            ids.append(obj['id'])
+            visit(obj.get('objects', []))
+    
+    for layer in data['layers']:
+        visit(layer['objects'])
+    for symbol in data.get('symbols', []):
+        ids.append(symbol['id'])
+        visit(symbol['objects'])
+    return ids
+
+
+def test_duplicate_group_gives_children_fresh_ids():
+    manager = ObjectManager()
+    manager.add_object(VectorPixel(1, 1, RED))
+    manager.add_object(VectorPixel(2, 2, BLUE))
+    manager.select_all()
+    manager.group_selected()
+    manager.select_all()
+    
+    copies = manager.duplicate_selected(4, 0)
+    
+    assert len(copies) == 1
+    ids = all_ids(manager.to_dict())
+    assert len(ids) == 6
+    assert len(set(ids)) == len(ids)
+
+
+def test_ungroup_instance_gives_copies_fresh_ids():
+    manager = ObjectManager()
+    manager.add_object(VectorPixel(1, 1, RED))
+    manager.add_object(VectorRectangle(2, 2, 4, 4, BLUE, True))
+    manager.select_all()
+    manager.create_symbol_from_selected("Motif")
+    manager.select_all()
+    manager.duplicate_selected(8, 0)  # Selects the copy; the original keeps the symbol in use
+    
+    manager.ungroup_selected()
+    
+    ids = all_ids(manager.to_dict())
+    assert len(set(ids)) == len(ids)
+
+
+def test_change_color_skips_bitmaps():
+    from PIL import Image
+    from src.vector_objects import VectorBitmap
+    manager = ObjectManager()
+    pixel = VectorPixel(1, 1, RED)
+    bitmap = VectorBitmap(0, 0, Image.new('RGBA', (4, 4), RED))
+    manager.add_object(pixel)
+    manager.add_object(bitmap)
+    manager.select_all()
+    
+    assert manager.change_selected_color(BLUE) == 1
+    assert pixel.color == BLUE
+    assert bitmap.color != BLUE
+
+
+def test_symbol_in_indexed_document():
+    manager = ObjectManager()
+    manager.set_indexed(True)
+    manager.add_object(VectorPixel(2, 3, RED))
+    manager.select_all()
+    
+    instance = manager.create_symbol_from_selected("Dot")
+    manager.duplicate_selected(4, 0)
+    
+    assert instance.symbol.indexed
+    image = manager.rasterize(16, 16)
+    assert image.getpixel((2, 3)) == RED
+    assert image.getpixel((6, 3)) == RED
+    assert manager.get_object_at(6, 3) is not None
+
+
+def test_change_color_skips_instances():
+    manager = ObjectManager()
+    manager.add_object(VectorPixel(1, 1, RED))
+    manager.select_all()
+    instance = manager.create_symbol_from_selected("Dot")
+    
+    assert manager.change_selected_color(BLUE) == 0
+    assert instance.symbol.objects[0].color == RED
+
+
+def test_panning_reuses_flattened_layers():
+    manager = ObjectManager()
+    manager.add_object(VectorRectangle(2, 2, 12, 12, RED, True))
+    manager.add_layer()
+    manager.add_object(VectorPixel(5, 5, BLUE))
+    full = manager.rasterize(16, 16)
+    below = manager._composite_cache['below'][1]
+    
+    region = (4, 3, 10, 9)
+    image = manager.rasterize(16, 16, region)
+    
+    assert manager._composite_cache['below'][1] is below
+    assert image.tobytes() == full.crop(region).tobytes()
+
+
+def test_floating_selection_keeps_layer_stacking():
+    manager = ObjectManager()
+    bottom = VectorRectangle(2, 2, 8, 8, RED, True)
+    manager.add_object(bottom)
+    manager.add_layer()
+    manager.add_object(VectorRectangle(6, 6, 12, 12, BLUE, True))
+    manager.select_object(bottom)  # Lifted from the layer below the current one
+    
+    floating = manager.begin_floating()
+    floating.offset = (2, 2)
+    dragged = manager.rasterize(16, 16, floating=(floating, floating.offset))
+    manager.end_floating()
+    
+    assert dragged.getpixel((7, 7)) == BLUE
+    assert dragged.tobytes() == manager.rasterize(16, 16).tobytes()
+
+
+def test_picking_reads_rendered_pixels():
+    from src.vector_objects import VectorPath
+    manager = ObjectManager()
+    manager.canvas_size = (64, 64)
+    under = VectorRectangle(4, 4, 30, 30, RED, True)
+    over = VectorRectangle(20, 20, 40, 40, BLUE, True)
+    manager.add_object(under)
+    manager.add_object(over)
+    hidden = manager.add_layer()
+    manager.add_object(VectorRectangle(0, 0, 63, 63, BLUE, True))
+    hidden.visible = False
+    manager.add_layer()
+    stroke = VectorPath([(10, 50), (50, 50)], RED, thickness=9)
+    manager.add_object(stroke)
+    
+    assert manager.get_object_at(25, 25) is over
+    assert manager.get_object_at(10, 10) is under
+    assert manager.get_object_at(30, 53) is stroke  # Inside the stroke's width, off its centre line
+    assert manager.get_object_at(30, 58) is None
+    assert manager.get_object_at(60, 5) is None  # Only the hidden layer covers it
+
+
+def test_palette_edit_recolours_without_touching_tiles_each_frame():
+    manager = ObjectManager()
+    manager.set_indexed(True)
+    manager.add_object(VectorPixel(2, 3, RED))
+    assert manager.rasterize(16, 16).getpixel((2, 3)) == RED
+    tile = manager.current_layer.tile_cache.tiles[(0, 0)]
+    palette = tile.palette
+    
+    manager.rasterize(16, 16, (0, 0, 8, 8))
+    assert tile.palette is palette  # Composites read the tile without setting its palette again
+    
+    manager.set_palette_color(manager.color_table.index_of(RED), BLUE)
+    assert manager.rasterize(16, 16).getpixel((2, 3)) == BLUE
+    assert manager.pixel_at(2, 3, 16, 16) == BLUE
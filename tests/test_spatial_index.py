@@ -0,0 +1,78 @@
+"""
+SpatialIndex queries against a brute-force scan of object bounds
+"""
+import random
+
+from src.spatial_index import CELL_SIZE, SpatialIndex
+from src.vector_objects import VectorLine, VectorRectangle
+
+
+def overlapping(objects, rect):
+    x0, y0, x1, y1 = rect
+    hits = set()
+    for obj in objects:
+        bx0, by0, bx1, by1 = obj.get_bounds()
+        if bx0 <= x1 and bx1 >= x0 and by0 <= y1 and by1 >= y0:
+            hits.add(obj)
+    return hits
+
+
+def random_rect(rng, span):
+    x, y = rng.uniform(-50, 1000), rng.uniform(-50, 1000)
+    return (x, y, x + rng.uniform(0, span), y + rng.uniform(0, span))
+
+
+def random_object(rng):
+    # Up to many cells wide, and sometimes past MAX_CELLS
+    x0, y0, x1, y1 = random_rect(rng, rng.choice([4, 3 * CELL_SIZE, 20 * CELL_SIZE]))
+    if rng.random() < 0.5:
+        return VectorRectangle(x0, y0, x1, y1)
+    return VectorLine(x0, y0, x1, y1, thickness=rng.randint(1, 6))
+
+
+def check_queries(index, objects, rng):
+    for _ in range(50):
+        rect = random_rect(rng, rng.choice([0, 40, 300]))
+        found = index.query_rect(rect)
+        assert found <= set(objects)
+        assert overlapping(found, rect) == overlapping(objects, rect)
+        x, y = rect[:2]
+        found = index.query_point(x, y)
+        assert found <= set(objects)
+        assert {obj for obj in found if obj.contains_point(x, y)} == \
+            {obj for obj in objects if obj.contains_point(x, y)}
+
+
+def test_queries_match_brute_force_after_edits():
+    rng = random.Random(5)
+    index = SpatialIndex()
+    objects = [random_object(rng) for _ in range(120)]
+    for obj in objects:
+        index.insert(obj)
+    assert len(index) == len(objects)
+    check_queries(index, objects, rng)
+
+    for obj in rng.sample(objects, 40):
+        obj.translate(rng.uniform(-200, 200), rng.uniform(-200, 200))
+        index.update(obj)
+    check_queries(index, objects, rng)
+
+    for obj in rng.sample(objects, 50):
+        objects.remove(obj)
+        index.remove(obj)
+    assert len(index) == len(objects)
+    check_queries(index, objects, rng)
+
+
+def test_removed_objects_leave_no_cells():
+    index = SpatialIndex()
+    wide = VectorRectangle(0, 0, 5 * CELL_SIZE, 2 * CELL_SIZE)
+    index.insert(wide)
+    assert wide in index.query_rect((4 * CELL_SIZE, CELL_SIZE, 4 * CELL_SIZE, CELL_SIZE))
+
+    wide.translate(10 * CELL_SIZE, 0)
+    index.update(wide)
+    assert wide not in index.query_rect((CELL_SIZE, CELL_SIZE, CELL_SIZE, CELL_SIZE))
+
+    index.remove(wide)
+    assert not index.cells and not index.large
@@ -0,0 +1,101 @@
+"""
+Tiled rendering must match drawing on one full-size canvas
+"""
+import random
+
+from PIL import Image, ImageChops, ImageDraw
+
+from src.object_manager import Layer, ObjectManager
+from src.tile_cache import OffsetDraw
+from src.vector_objects import VectorCircle, VectorLine, VectorPath, VectorRectangle
+
+
+def tiled_line(size, xy, width, joint, tile_size):
+    out = Image.new('L', (size, size), 0)
+    for ty in range(0, size, tile_size):
+        for tx in range(0, size, tile_size):
+            tile = Image.new('L', (tile_size, tile_size), 0)
+            OffsetDraw(tile, tx, ty).line(xy, fill=255, width=width, joint=joint)
+            out.paste(tile, (tx, ty))
+    return out
+
+
+def test_wide_lines_match_full_canvas_draw():
+    rng = random.Random(11)
+    for n in range(200):
+        count = rng.randint(2, 6)
+        # Fractional and integer points, some off the negative edges
+        if n % 2:
+            xy = [rng.uniform(-40, 300) for _ in range(2 * count)]
+        else:
+            xy = [rng.randint(-40, 300) for _ in range(2 * count)]
+        width = rng.choice([2, 3, 5, 7, 9, 12, 16])
+        joint = rng.choice([None, 'curve'])
+        expected = Image.new('L', (256, 256), 0)
+        ImageDraw.Draw(expected).line(xy, fill=255, width=width, joint=joint)
+        got = tiled_line(256, xy, width, joint, rng.choice([32, 64, 128]))
+        assert ImageChops.difference(expected, got).getbbox() is None, (xy, width, joint)
+
+
+def test_layer_tiles_match_full_canvas_draw():
+    layer = Layer()
+    path = VectorPath([(-7.5, 300.25), (150.5, 10.75), (290.25, 200.5), (40, 500)],
+                      color=(200, 30, 30, 255), thickness=11)
+    layer.add(path)
+    layer.mark_dirty()
+
+    expected = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
+    path.draw_to_image(ImageDraw.Draw(expected))
+    got = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
+    layer.render_tiles(512, 512).composite_onto(got)
+    assert ImageChops.difference(expected, got).getbbox() is None
+
+
+def random_object(rng, size):
+    color = (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255), 255)
+    kind = rng.randrange(4)
+    if kind == 0:
+        points = [(rng.uniform(-20, size), rng.uniform(-20, size)) for _ in range(rng.randint(2, 6))]
+        return VectorPath(points, color, thickness=rng.choice([1, 3, 7, 12]))
+    if kind == 1:
+        return VectorLine(rng.uniform(0, size), rng.uniform(0, size), rng.uniform(0, size),
+                          rng.uniform(0, size), color, thickness=rng.choice([1, 4, 9]))
+    if kind == 2:
+        return VectorCircle(rng.uniform(0, size), rng.uniform(0, size), rng.uniform(2, 60), color,
+                            filled=rng.random() < 0.5)
+    return VectorRectangle(rng.uniform(0, size), rng.uniform(0, size), rng.uniform(0, size),
+                           rng.uniform(0, size), color, filled=rng.random() < 0.5)
+
+
+def render(layer, size):
+    image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    layer.render_tiles(size, size).composite_onto(image)
+    return image
+
+
+def test_incremental_repaint_matches_fresh_render():
+    size = 400
+    for seed in range(12):
+        rng = random.Random(seed)
+        manager = ObjectManager()
+        for _ in range(20):
+            manager.add_object(random_object(rng, size))
+        layer = manager.current_layer
+        render(layer, size)
+        for step in range(8):
+            action = ('add', 'move', 'delete')[step % 3]
+            if action == 'add':
+                manager.add_object(random_object(rng, size))
+            else:
+                manager.deselect_all()
+                for obj in rng.sample(list(layer.objects), 2):
+                    manager.select_object(obj)
+                if action == 'move':
+                    manager.translate_selected(rng.uniform(-30, 30), rng.uniform(-30, 30))
+                else:
+                    manager.delete_selected()
+
+            fresh = Layer()
+            for obj in layer.objects:
+                fresh.add(obj)
+            assert render(layer, size).tobytes() == render(fresh, size).tobytes(), (seed, step)
@@ -0,0 +1,74 @@
+"""
+Tilemap layers: painting cells, per-cell damage and erasing
+"""
+from PIL import Image
+
+from src.object_manager import ObjectManager
+from src.vector_objects import VectorPixel
+
+
+RED = (255, 0, 0, 255)
+BLUE = (0, 0, 255, 255)
+
+
+def tileset():
+    """Two 4x4 tiles: index 1 red, index 2 blue"""
+    atlas = Image.new('RGBA', (8, 4), RED)
+    atlas.paste(BLUE, (4, 0, 8, 4))
+    return atlas
+
+
+def tilemap_manager():
+    manager = ObjectManager()
+    layer = manager.add_tilemap_layer(tileset(), 4, 4, 4)
+    manager.rasterize(16, 16)
+    return manager, layer
+
+
+def test_paint_tile_damages_only_its_cell():
+    manager, layer = tilemap_manager()
+    
+    assert manager.paint_tile(5, 6, 1)
+    
+    assert layer.get_cell(1, 1) == 1
+    assert layer.tile_cache.damage == {(0, 0): (4, 4, 8, 8)}
+    image = manager.rasterize(16, 16)
+    assert image.getpixel((4, 4)) == RED and image.getpixel((7, 7)) == RED
+    assert image.getpixel((3, 4))[3] == 0 and image.getpixel((8, 7))[3] == 0
+
+
+def test_paint_tile_rejects_no_op_and_out_of_range_edits():
+    manager, layer = tilemap_manager()
+    assert manager.paint_tile(0, 0, 2)
+    
+    assert not manager.paint_tile(1, 1, 2)  # Same cell, same index
+    assert not manager.paint_tile(16, 0, 1)  # Outside the map
+    assert not manager.paint_tile(0, 0, 3)  # Past the atlas
+    assert not manager.paint_tile(-1, 0, 1)
+
+
+def test_erase_with_index_zero():
+    manager, layer = tilemap_manager()
+    manager.paint_tile(0, 0, 2)
+    manager.paint_tile(12, 12, 1)
+    assert manager.rasterize(16, 16).getpixel((1, 1)) == BLUE
+    
+    assert manager.paint_tile(2, 2, 0)
+    
+    image = manager.rasterize(16, 16)
+    assert image.getpixel((1, 1))[3] == 0
+    assert image.getpixel((13, 13)) == RED
+    
+    manager.paint_tile(12, 12, 0)
+    manager.rasterize(16, 16)
+    assert not layer.tile_cache.tiles  # Empty tiles are freed
+
+
+def test_objects_draw_over_cells():
+    manager, layer = tilemap_manager()
+    manager.paint_tile(0, 0, 1)
+    manager.add_object(VectorPixel(1, 1, BLUE))
+    
+    image = manager.rasterize(16, 16)
+    assert image.getpixel((1, 1)) == BLUE
+    assert image.getpixel((2, 2)) == RED
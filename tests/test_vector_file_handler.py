@@ -0,0 +1,91 @@
+"""
+.plb save/load round trips through VectorFileHandler
+"""
+from types import SimpleNamespace
+
+from src.object_manager import ObjectManager
+from src.vector_file_handler import VectorFileHandler
+from src.vector_objects import VectorPixel
+
+
+RED = (255, 0, 0, 255)
+
+
+def round_trip(manager, tmp_path, width=16, height=16):
+    """Save manager to a .plb file and load it into a new ObjectManager"""
+    canvas = SimpleNamespace(object_manager=manager, width=width, height=height)
+    path = VectorFileHandler.save_plb(str(tmp_path / "doc.plb"), canvas, None)
+    loaded = ObjectManager()
+    loaded.from_dict(VectorFileHandler.load_plb(path))
+    return loaded
+
+
+def test_indexed_document_round_trip(tmp_path):
+    manager = ObjectManager()
+    manager.set_indexed(True)
+    manager.add_object(VectorPixel(3, 4, RED))
+    
+    loaded = round_trip(manager, tmp_path)
+    
+    assert loaded.indexed
+    assert loaded.color_table.to_list() == manager.color_table.to_list()
+    assert loaded.rasterize(16, 16).getpixel((3, 4)) == RED
+
+
+def test_instance_round_trip(tmp_path):
+    manager = ObjectManager()
+    manager.add_object(VectorPixel(1, 1, RED))
+    manager.select_all()
+    manager.create_symbol_from_selected("Dot")
+    manager.select_all()
+    manager.duplicate_selected(5, 2)
+    
+    loaded = round_trip(manager, tmp_path)
+    
+    image = loaded.rasterize(16, 16)
+    assert image.getpixel((1, 1)) == RED
+    assert image.getpixel((6, 3)) == RED
+    assert loaded.get_object_at(6, 3) is not None
+
+
+def test_moved_objects_round_trip(tmp_path):
+    from src.vector_objects import VectorGroup, VectorPath, VectorRectangle
+    manager = ObjectManager()
+    path = VectorPath([(1, 1), (6.5, 4), (9, 2)], RED, thickness=3)
+    group = VectorGroup([VectorRectangle(2, 8, 6, 12, RED, True), VectorPath([(1, 14), (8, 15)], RED)])
+    manager.add_object(path)
+    manager.add_object(group)
+    path.translate(3, 2.5)
+    group.translate(4, -1)
+    bounds = [obj.get_bounds() for obj in (path, group)]
+    image = manager.rasterize(16, 16)
+    
+    loaded = round_trip(manager, tmp_path)
+    
+    assert [obj.get_bounds() for obj in loaded.current_layer.objects] == bounds
+    assert loaded.rasterize(16, 16).tobytes() == image.tobytes()
+    assert [type(loaded.get_object_at(x, y)) for x, y in ((8, 5), (8, 9))] == [VectorPath, VectorGroup]
+
+
+def test_tilemap_round_trip(tmp_path):
+    from PIL import Image
+    from src.object_manager import TilemapLayer
+    for indexed in (False, True):
+        manager = ObjectManager()
+        manager.set_indexed(indexed)
+        atlas = Image.new('RGBA', (8, 4), RED)
+        atlas.paste((0, 0, 255, 255), (4, 0, 8, 4))
+        layer = manager.add_tilemap_layer(atlas, 4, 4, 3, "Map")
+        manager.paint_tile(1, 1, 1)
+        manager.paint_tile(13, 9, 2)
+        manager.add_object(VectorPixel(6, 6, RED))
+        image = manager.rasterize(16, 16)
+        
+        loaded = round_trip(manager, tmp_path)
+        
+        restored = loaded.layers[-1]
+        assert isinstance(restored, TilemapLayer)
+        assert (restored.name, restored.cell_size, restored.cols, restored.rows) == ("Map", 4, 4, 3)
+        assert list(restored.cells) == list(layer.cells)
+        assert len(restored.objects) == 1
+        assert loaded.rasterize(16, 16).tobytes() == image.tobytes()
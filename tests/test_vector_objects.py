@@ -0,0 +1,83 @@
+"""
+Vector object geometry
+"""
+import math
+import random
+
+from PIL import Image
+
+from src.tile_cache import OffsetDraw
+from src.vector_objects import VectorCircle, VectorGroup, VectorPath, VectorRectangle
+
+
+def distance_to_polyline(point, polyline):
+    px, py = point
+    best = math.inf
+    for (x0, y0), (x1, y1) in zip(polyline, polyline[1:]):
+        dx, dy = x1 - x0, y1 - y0
+        length_sq = dx * dx + dy * dy
+        t = 0 if not length_sq else max(0, min(1, ((px - x0) * dx + (py - y0) * dy) / length_sq))
+        best = min(best, math.hypot(px - (x0 + t * dx), py - (y0 + t * dy)))
+    return best
+
+
+def wobbly_stroke(seed, count=200):
+    rng = random.Random(seed)
+    return [(i * 0.7, 20 + 6 * math.sin(i / 9) + rng.uniform(-0.4, 0.4)) for i in range(count)]
+
+
+def test_simplify_with_zero_tolerance_is_a_no_op():
+    path = VectorPath(wobbly_stroke(1))
+    before = path.points
+    assert path.simplify(0) == 0
+    assert path.points == before
+
+
+def test_simplify_collapses_collinear_points():
+    path = VectorPath([(x, 2 * x + 1) for x in range(10)])
+    assert path.simplify(0.5) == 8
+    assert path.points == [(0, 1), (9, 19)]
+
+
+def test_simplify_keeps_endpoints_and_stays_within_tolerance():
+    for seed in range(5):
+        path = VectorPath(wobbly_stroke(seed))
+        points = path.points  # As stored, in float32
+        removed = path.simplify(1.0)
+        simplified = path.points
+        assert removed > 0
+        assert len(simplified) == len(points) - removed
+        assert simplified[0] == points[0] and simplified[-1] == points[-1]
+        assert all(distance_to_polyline(p, simplified) <= 1.0 + 1e-3 for p in points)
+
+
+def test_simplify_keeps_corners_beyond_tolerance():
+    path = VectorPath([(0, 0), (5, 0), (10, 0), (10, 5), (10, 10)])
+    path.simplify(1.0)
+    assert path.points == [(0, 0), (10, 0), (10, 10)]
+
+
+def snapshot(obj):
+    """compute_bounds, hit-test results over a grid and rendered pixels of an object"""
+    hits = [obj.contains_point(x / 2, y / 2) for y in range(0, 96) for x in range(0, 96)]
+    image = Image.new('RGBA', (48, 48), (0, 0, 0, 0))
+    obj.draw_to_image(OffsetDraw(image))
+    return obj.compute_bounds(), hits, image.tobytes()
+
+
+def moved_objects():
+    path = VectorPath([(4, 4), (12.5, 9), (20, 4.25)], thickness=3)
+    inner = VectorGroup([VectorCircle(10, 20, 4, filled=True)])
+    inner.translate(2, 1.5)
+    group = VectorGroup([VectorPath([(2, 30), (14, 34)], thickness=5), VectorRectangle(20, 20, 26, 28), inner])
+    path.translate(6.5, 7)
+    group.translate(5, -3.5)
+    return [path, group]
+
+
+def test_bake_transform_keeps_geometry():
+    for obj in moved_objects():
+        before = snapshot(obj)
+        obj.bake_transform()
+        assert obj.offset == (0, 0)
+        assert snapshot(obj) == before
@@ -0,0 +1,89 @@
+"""
+ZOrderList order and z-keys against a plain list
+"""
+import copy
+import random
+
+from src.zorder import ZOrderList
+
+
+def assert_consistent(zlist, model):
+    assert list(zlist) == model
+    assert len(zlist) == len(model)
+    keys = [zlist.key(obj) for obj in model]
+    assert keys == sorted(keys) and len(set(keys)) == len(keys)
+
+
+def test_append_and_appendleft():
+    zlist = ZOrderList(['b', 'c'])
+    zlist.appendleft('a')
+    zlist.append('d')
+    assert_consistent(zlist, ['a', 'b', 'c', 'd'])
+    assert zlist.above('b') == 'c' and zlist.below('b') == 'a'
+    assert zlist.above('d') is None and zlist.below('a') is None
+
+
+def test_moves():
+    zlist = ZOrderList('abcd')
+    zlist.move_to_front('a')
+    assert_consistent(zlist, list('bcda'))
+    zlist.move_to_back('d')
+    assert_consistent(zlist, list('dbca'))
+    assert zlist.move_up('b')
+    assert_consistent(zlist, list('dcba'))
+    assert not zlist.move_up('a')
+    assert zlist.move_down('c')
+    assert_consistent(zlist, list('cdba'))
+    assert not zlist.move_down('c')
+
+
+def test_keys_follow_order_through_random_edits():
+    rng = random.Random(3)
+    zlist, model, counter = ZOrderList(), [], 0
+    for _ in range(2000):
+        action = rng.randrange(7)
+        if action < 2 or not model:
+            counter += 1
+            if action == 0:
+                zlist.append(counter)
+                model.append(counter)
+            else:
+                zlist.appendleft(counter)
+                model.insert(0, counter)
+            continue
+        obj = rng.choice(model)
+        i = model.index(obj)
+        if action == 2:
+            zlist.remove(obj)
+            model.remove(obj)
+        elif action == 3:
+            zlist.move_to_front(obj)
+            model.append(model.pop(i))
+        elif action == 4:
+            zlist.move_to_back(obj)
+            model.insert(0, model.pop(i))
+        elif action == 5:
+            assert zlist.move_up(obj) == (i < len(model) - 1)
+            if i < len(model) - 1:
+                model[i], model[i + 1] = model[i + 1], model[i]
+        else:
+            assert zlist.move_down(obj) == (i > 0)
+            if i > 0:
+                model[i], model[i - 1] = model[i - 1], model[i]
+        assert_consistent(zlist, model)
+
+
+def test_in_order_skips_removed_objects():
+    zlist = ZOrderList('abcd')
+    zlist.move_to_front('b')
+    zlist.remove('c')
+    assert zlist.in_order({'a', 'b', 'c', 'd'}) == ['a', 'd', 'b']
+
+
+def test_copy_keeps_order():
+    zlist = ZOrderList('abc')
+    zlist.move_to_back('c')
+    copied = copy.deepcopy(zlist)
+    assert_consistent(copied, list('cab'))
+    copied.append('d')
+    assert list(zlist) == list('cab')